@@ -0,0 +1,395 @@
+"""
+Two-level album art thumbnail cache.
+
+Thumbnails are keyed by (art identity, size). The art identity is the
+SongRecord's art hash (embedded cover bytes or the folder's cover file), so
+every track of an album shares one entry. Level one is a bounded LRU of
+ready-made CTkImages; level two is a directory of pre-scaled WebP (or PNG)
+thumbnails trimmed by total size. Only a miss on both decodes the original
+artwork.
+
+get_thumbnail() is Tk-free and safe on worker threads; get() wraps the result
+in a CTkImage and must run on the Tk thread. ArtLoader does the slow part on a
+worker thread and hands the finished image back through the Tk event loop.
+
+Playlist icons are normalised the same way, once, when the playlist is saved:
+make_icon_set() writes one ready-sized variant per ICON_SIZES entry.
+"""
+
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import songRecord
+
+
+MEMORY_ITEMS = 64                   # CTkImages kept in memory
+SOURCE_ITEMS = 4                    # decoded originals kept for the other sizes
+MAX_DISK_BYTES = 64 * 1024 * 1024   # thumbnail directory budget
+PLACEHOLDER_KEY = "placeholder"
+URL_TIMEOUT = 10                    # seconds to wait for remote artwork
+ICON_SIZES = {"sidebar": 32, "grid": 128, "header": 256}   # playlist icon variants
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+        return (st.st_size, st.st_mtime_ns)
+    except OSError:
+        return None
+
+
+def _digest(text):
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+
+def _resample():
+    from PIL import Image  # type: ignore
+    try:
+        return Image.Resampling.LANCZOS     # Pillow >= 9.1
+    except Exception:
+        return getattr(Image, "LANCZOS", getattr(Image, "ANTIALIAS", None))
+
+
+def fit_square(img, size):
+    """Crop/scale `img` to a size x size square, across Pillow versions."""
+    from PIL import ImageOps  # type: ignore
+    resample = _resample()
+    try:
+        return ImageOps.fit(img, (size, size), method=resample)
+    except TypeError:
+        try:
+            return ImageOps.fit(img, (size, size), resample=resample)
+        except Exception:
+            return img.resize((size, size), resample)
+
+
+def image_format():
+    """(extension, PIL format, save options) for generated images: WebP when Pillow has it."""
+    try:
+        from PIL import features  # type: ignore
+        if features.check("webp"):
+            return ".webp", "WEBP", {"quality": 90}
+    except Exception:
+        pass
+    return ".png", "PNG", {"optimize": True}
+
+
+def contain_square(img, size):
+    """Scale `img` to fit a size x size square, centred on transparency (no cropping)."""
+    from PIL import Image, ImageOps  # type: ignore
+    img = img.convert("RGBA")
+    try:
+        contained = ImageOps.contain(img, (size, size), method=_resample())
+    except TypeError:
+        contained = ImageOps.contain(img, (size, size))
+    square = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    square.paste(contained, ((size - contained.width) // 2, (size - contained.height) // 2), contained)
+    return square
+
+
+def make_icon_set(source, directory, stem):
+    """
+    Write one pre-scaled variant of the image `source` per ICON_SIZES entry as
+    directory/<stem>_<size>.<ext> and return {variant name: absolute path}.
+    """
+    from PIL import Image  # type: ignore
+    ext, fmt, options = image_format()
+    with Image.open(source) as opened:
+        img = opened.convert("RGBA")
+    variants = {}
+    for name, size in ICON_SIZES.items():
+        target = os.path.join(str(directory), f"{stem}_{size}{ext}")
+        tmp_path = f"{target}.tmp"
+        contain_square(img, size).save(tmp_path, format=fmt, **options)
+        os.replace(tmp_path, target)
+        variants[name] = os.path.abspath(target)
+    return variants
+
+
+def playlist_icon(entry, variant="header"):
+    """
+    The ready-sized PIL image of a playlist's icon, or None. Playlists saved
+    before icon variants existed get theirs generated beside the original the
+    first time they are shown.
+    """
+    from PIL import Image  # type: ignore
+    path = (entry.get("icon_sizes") or {}).get(variant)
+    if not path or not os.path.exists(path):
+        icon = entry.get("icon")
+        if not icon or not os.path.exists(icon):
+            return None
+        directory, name = os.path.split(icon)
+        stem = f"{os.path.splitext(name)[0]}_icon"
+        path = os.path.join(directory, f"{stem}_{ICON_SIZES[variant]}{image_format()[0]}")
+        if not os.path.exists(path):
+            path = make_icon_set(icon, directory, stem)[variant]
+    with Image.open(path) as opened:
+        return opened.convert("RGBA")
+
+
+def art_source(path):
+    """
+    Return (key, loader) for the artwork of `path` without decoding it. Tracks
+    sharing a cover (embedded bytes or the folder's cover.jpg) share its art
+    hash, and so one key. loader() returns an RGBA PIL image, or None.
+    """
+    from PIL import Image  # type: ignore
+
+    if path and path.startswith(("http://", "https://")):
+        def load_url():
+            import requests as rq  # type: ignore
+            response = rq.get(path, timeout=URL_TIMEOUT)
+            return Image.open(io.BytesIO(response.content)).convert("RGBA")
+        return f"u{_digest(path)}", load_url
+
+    if path:
+        record = songRecord.get(path)
+        if record.art_hash:
+            def load_cover():
+                art = songRecord.get_art(path)
+                return Image.open(io.BytesIO(art)).convert("RGBA") if art else None
+            return f"a{record.art_hash}", load_cover
+
+    return PLACEHOLDER_KEY, lambda: None
+
+
+class ThumbnailCache:
+
+    def __init__(self, directory, memory_items=MEMORY_ITEMS, max_disk_bytes=MAX_DISK_BYTES):
+        self.directory = str(directory)
+        self.memory_items = memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self._images = OrderedDict()    # (key, size) -> CTkImage
+        self._sources = OrderedDict()   # key -> decoded original
+        self._keys = {}                 # path -> (size, mtime_ns) when resolved, art key
+        self._lock = threading.RLock()
+        self._disk_bytes = None         # measured lazily on the first store
+        self.hits = {"memory": 0, "disk": 0, "decode": 0}
+        os.makedirs(self.directory, exist_ok=True)
+        self._ext, self._format, self._save_options = image_format()
+
+    def _thumb_path(self, key, size):
+        return os.path.join(self.directory, f"{key}_{size}{self._ext}")
+
+    # ------------------ level two: disk ------------------
+
+    def get_thumbnail(self, path, size):
+        """Return (key, size x size PIL image) for `path`, from disk or freshly scaled."""
+        from PIL import Image  # type: ignore
+        sig = _signature(path) if path else None
+        key, loader = art_source(path)
+        self._keys[path] = (sig, key)
+        thumb_path = self._thumb_path(key, size)
+        try:
+            with Image.open(thumb_path) as cached:
+                img = cached.convert("RGBA")
+            os.utime(thumb_path)    # recency for eviction
+            self.hits["disk"] += 1
+            return key, img
+        except (OSError, ValueError):
+            pass
+
+        with self._lock:
+            source = self._sources.get(key)
+        if source is None:
+            try:
+                source = loader()
+            except Exception as e:
+                print(f"[ThumbnailCache] Error reading art for {path}: {e}")
+                source = None
+            if source is None and key != PLACEHOLDER_KEY:
+                # show the placeholder, but don't save it as this cover: the next request retries
+                return self.get_thumbnail("", size)
+            if source is None:
+                source = Image.new("RGB", (size, size), (50, 50, 50))
+            with self._lock:
+                self._sources[key] = source
+                while len(self._sources) > SOURCE_ITEMS:
+                    self._sources.popitem(last=False)
+        self.hits["decode"] += 1
+
+        img = fit_square(source, size)
+        self._store(thumb_path, img)
+        return key, img
+
+    def _store(self, thumb_path, img):
+        tmp_path = f"{thumb_path}.tmp"
+        try:
+            img.save(tmp_path, format=self._format, **self._save_options)
+            os.replace(tmp_path, thumb_path)
+            written = os.path.getsize(thumb_path)
+        except Exception as e:
+            print(f"[ThumbnailCache] Error saving {thumb_path}: {e}")
+            return
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._measure()
+            else:
+                self._disk_bytes += written
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict()
+
+    def _measure(self):
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file():
+                    total += entry.stat().st_size
+        return total
+
+    def _evict(self):
+        """Delete least recently used thumbnails until the directory is at 80 % of its budget."""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file():
+                    st = entry.stat()
+                    entries.append((st.st_mtime_ns, st.st_size, entry.path))
+        entries.sort()
+        total = sum(size for _m, size, _p in entries)
+        target = self.max_disk_bytes * 0.8
+        for _mtime, size, entry_path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(entry_path)
+                total -= size
+            except OSError:
+                pass
+        self._disk_bytes = total
+
+    # ------------------ level one: memory ------------------
+
+    def cached(self, path, size, resolve=False):
+        """
+        The ready CTkImage for `path` if its cover is in memory. Never decodes; only
+        parses tags when `resolve` is set and the path's art key is not known yet,
+        so a new track of an album whose cover is loaded still hits.
+        """
+        key = PLACEHOLDER_KEY if not path else self._known_key(path)
+        if key is None and resolve:
+            sig = _signature(path)
+            key = art_source(path)[0]
+            self._keys[path] = (sig, key)
+        if key is None:
+            return None
+        with self._lock:
+            image = self._images.get((key, size))
+            if image is not None:
+                self._images.move_to_end((key, size))
+                self.hits["memory"] += 1
+            return image
+
+    def _known_key(self, path):
+        """The art key resolved for `path`, unless the file changed (e.g. was re-tagged) since."""
+        known = self._keys.get(path)
+        if known is None:
+            return None
+        if _signature(path) != known[0]:
+            self._keys.pop(path, None)
+            return None
+        return known[1]
+
+    def remember(self, key, size, img):
+        """Wrap a thumbnail in a CTkImage and keep it in the LRU (Tk thread only)."""
+        from customtkinter import CTkImage  # type: ignore
+        image = CTkImage(light_image=img, dark_image=img, size=(size, size))
+        with self._lock:
+            self._images[(key, size)] = image
+            self._images.move_to_end((key, size))
+            while len(self._images) > self.memory_items:
+                self._images.popitem(last=False)
+        return image
+
+    def stats(self):
+        """In-memory images, the distinct covers behind them, and hit counts per level."""
+        with self._lock:
+            return dict(self.hits, images=len(self._images), covers=len({key for key, _size in self._images}))
+
+    def get(self, path, size):
+        """CTkImage of the artwork for `path` at size x size (Tk thread only)."""
+        image = self.cached(path, size, resolve=True)
+        if image is not None:
+            return image
+        key, img = self.get_thumbnail(path, size)
+        return self.remember(key, size, img)
+
+
+class ArtLoader:
+    """
+    Loads thumbnails on a worker thread, one outstanding request per target.
+
+    `schedule(fn)` is called on the worker thread and must get fn run on the Tk thread
+    without touching Tk itself (e.g. App.call_on_tk).
+    A new request for a target cancels the previous one if it has not started and
+    discards its result if it has, so clicking through tracks only ever shows the
+    last one.
+    """
+
+    def __init__(self, cache, schedule, workers=2):
+        self.cache = cache
+        self._schedule = schedule
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="art")
+        self._latest = {}       # target -> (generation, future)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def request(self, target, path, size, on_ready, placeholder=None):
+        """
+        Call on_ready(CTkImage) on the Tk thread with the art for `path`. A memory
+        hit is delivered straight away; otherwise on_ready(placeholder-art) is
+        called first (if `placeholder`), then again once the worker is done.
+        """
+        image = self.cache.cached(path, size)
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            previous = self._latest.pop(target, None)
+            if previous is not None:
+                previous[1].cancel()
+            if image is None:
+                future = self._executor.submit(self._work, target, generation, path, size, on_ready)
+                self._latest[target] = (generation, future)
+        if image is not None:
+            on_ready(image)
+        elif placeholder:
+            on_ready(self.cache.get("", size))
+
+    def _current(self, target, generation):
+        with self._lock:
+            latest = self._latest.get(target)
+            return latest is not None and latest[0] == generation
+
+    def _work(self, target, generation, path, size, on_ready):
+        if not self._current(target, generation):
+            return
+        try:
+            image = self.cache.cached(path, size, resolve=True)
+            key, img = (None, None) if image is not None else self.cache.get_thumbnail(path, size)
+        except Exception as e:
+            print(f"[ArtLoader] Error loading art for {path}: {e}")
+            return
+        self._schedule(lambda: self._deliver(target, generation, key, size, img, on_ready, image))
+
+    def _deliver(self, target, generation, key, size, img, on_ready, image=None):
+        if not self._current(target, generation):
+            return
+        with self._lock:
+            self._latest.pop(target, None)
+        on_ready(image if image is not None else self.cache.remember(key, size, img))
+
+    def cancel(self, target=None):
+        with self._lock:
+            targets = list(self._latest) if target is None else [target]
+            for t in targets:
+                latest = self._latest.pop(t, None)
+                if latest is not None:
+                    latest[1].cancel()
+
+    def close(self):
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
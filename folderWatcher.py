@@ -0,0 +1,212 @@
+"""
+Live watcher for the Music folder.
+
+Uses inotify on Linux (through ctypes, no extra dependency) and falls back to a
+low-frequency scandir poll everywhere else, or when inotify runs out of
+watches. Bursts of events (e.g. an album being copied in) are debounced, then
+only the touched files/directories are rescanned through libraryScanner and
+applied to the user data store, which publishes the usual change events.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+import libraryScanner
+
+
+DEBOUNCE_SECONDS = 1.5      # quiet time required before a burst is applied
+MAX_DELAY_SECONDS = 10.0    # apply anyway if a burst keeps going this long
+POLL_INTERVAL = 30.0        # fallback poller period
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """Minimal ctypes binding: one fd, one watch per directory."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths = {}     # wd -> directory path
+
+    def watch(self, path):
+        wd = self._add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_add_watch failed for {path}: {os.strerror(err)}")
+        self.paths[wd] = path
+
+    def watch_tree(self, root):
+        stack = [root]
+        while stack:
+            current = stack.pop()
+            self.watch(current)
+            try:
+                with os.scandir(current) as it:
+                    stack.extend(e.path for e in it if e.is_dir(follow_symlinks=True))
+            except OSError:
+                continue
+
+    def read(self):
+        """Yield (directory, name, mask) for every queued event."""
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(buf):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(buf, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(buf[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            directory = self.paths.get(wd)
+            if mask & IN_IGNORED:
+                self.paths.pop(wd, None)
+            yield directory, name, mask
+
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class FolderWatcher:
+    """
+    Watches `root` on a daemon thread and calls on_change(ScanResult) after each
+    debounced batch has been written to the store. on_change runs on the watcher
+    thread; GUI callers must hop to the Tk thread themselves.
+    """
+
+    def __init__(self, root=libraryScanner.MUSIC_DIR, on_change=None, debounce=DEBOUNCE_SECONDS,
+                 poll_interval=POLL_INTERVAL, use_inotify=True):
+        self.root = os.path.realpath(root)
+        self.on_change = on_change
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify and sys.platform.startswith("linux")
+        self.backend = None     # "inotify" or "poll" once started
+        self._stop = threading.Event()
+        self._thread = None
+        self._scanner = None
+
+    def start(self):
+        if self._thread is not None or not os.path.isdir(self.root):
+            return
+        self._scanner = libraryScanner.LibraryScanner(self.root)
+        self._thread = threading.Thread(target=self._run, name="folderWatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    # ------------------ applying changes ------------------
+
+    def _apply(self, paths=None):
+        try:
+            result = libraryScanner.sync_library(self.root, paths=paths, scanner=self._scanner)
+        except Exception as e:
+            print(f"[FolderWatcher] Failed to apply folder changes: {e}")
+            return
+        if result and self.on_change:
+            try:
+                self.on_change(result)
+            except Exception as e:
+                print(f"[FolderWatcher] on_change failed: {e}")
+
+    # ------------------ backends ------------------
+
+    def _run(self):
+        inotify = None
+        if self.use_inotify:
+            try:
+                inotify = _Inotify()
+                inotify.watch_tree(self.root)
+            except Exception as e:
+                print(f"[FolderWatcher] inotify unavailable, polling instead: {e}")
+                if inotify is not None:
+                    inotify.close()
+                inotify = None
+
+        if inotify is not None:
+            self.backend = "inotify"
+            try:
+                self._run_inotify(inotify)
+            finally:
+                inotify.close()
+        else:
+            self.backend = "poll"
+            self._run_poll()
+
+    def _run_poll(self):
+        while not self._stop.wait(self.poll_interval):
+            self._apply()
+
+    def _run_inotify(self, inotify):
+        pending = set()         # files/subtrees to rescan
+        full_rescan = False
+        first_event = last_event = 0.0
+
+        while not self._stop.is_set():
+            if pending or full_rescan:
+                timeout = max(0.05, min(self.debounce - (time.monotonic() - last_event),
+                                        MAX_DELAY_SECONDS - (time.monotonic() - first_event)))
+            else:
+                timeout = 1.0
+            ready, _, _ = select.select([inotify.fd], [], [], timeout)
+
+            if ready:
+                now = time.monotonic()
+                if not pending and not full_rescan:
+                    first_event = now
+                last_event = now
+                for directory, name, mask in inotify.read():
+                    if mask & IN_Q_OVERFLOW or directory is None:
+                        full_rescan = True
+                        continue
+                    path = os.path.join(directory, name) if name else directory
+                    if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                        try:
+                            inotify.watch_tree(path)
+                        except OSError as e:
+                            print(f"[FolderWatcher] Cannot watch {path}: {e}")
+                            full_rescan = True
+                    if name and not (mask & IN_ISDIR) and not libraryScanner.is_audio_file(name):
+                        continue
+                    pending.add(path)
+
+            if not (pending or full_rescan):
+                continue
+            now = time.monotonic()
+            if now - last_event >= self.debounce or now - first_event >= MAX_DELAY_SECONDS:
+                self._apply(None if full_rescan else pending)
+                pending = set()
+                full_rescan = False
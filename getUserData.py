@@ -1,59 +1,510 @@
+import atexit
 import json
 import os
+import threading
+from contextlib import contextmanager
+from types import MappingProxyType
 
 
-USERDATA_FILE = "user.json"
+USERDATA_FILE = "user.json"      # legacy single-file format, migrated on first load
+USERDATA_DIR = "userdata"         # one JSON file per section
+SECTIONS = ("songs", "playlists", "settings", "song_meta", "song_lengths")
+EXTRAS_SECTION = "extras"         # every other top-level key
+ALL_SECTIONS = SECTIONS + (EXTRAS_SECTION,)
+CACHE_DIR = "cache"               # rebuildable caches (scan manifest, metadata, ...)
+USERDATA_BACKEND = os.getenv("PYTUNES_BACKEND", "json")  # "json" or "sqlite"
+FLUSH_INTERVAL = float(os.getenv("PYTUNES_FLUSH_INTERVAL", "2.0"))  # seconds between write-behind flushes
+JOURNAL_ENABLED = os.getenv("PYTUNES_JOURNAL", "0") == "1"   # append changes to a log instead of rewriting sections
+JOURNAL_FILE = "journal.log"
+JOURNAL_COMPACT_BYTES = 1024 * 1024   # fold the journal into the section files past this size
 
 
-def getUserData():
-    """Load and return the user's data from disk, or False if not found/invalid."""
-    if not os.path.exists(USERDATA_FILE):
-        return False
+def getCacheDir():
+    """Return the cache directory, creating it if missing."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return CACHE_DIR
 
-    try:
-        with open(USERDATA_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        if isinstance(data, list):
-            return data
-        
-        elif isinstance(data, dict):
-            return [data]
-        
+
+def _freeze(value):
+    """Return a read-only copy of `value` (dicts -> mappingproxy, lists -> tuple)."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def mutable_copy(value):
+    """Return a plain dict/list copy of `value`, thawing any read-only views."""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {k: mutable_copy(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [mutable_copy(v) for v in value]
+    return value
+
+
+_subscribers = {}   # token -> (callback, keys of interest or None)
+_subscribers_lock = threading.Lock()
+
+
+def subscribe(callback, keys=None):
+    """
+    Call `callback(changed_keys)` after the user data changes, where changed_keys
+    is a frozenset of top-level keys ("songs", "playlists", "settings", ...).
+    `keys` limits notifications to those keys. Returns an unsubscribe function.
+
+    Callbacks run on the thread that made the change, after the store has released
+    its lock; GUI code must hop to the Tk thread itself (see App.watch_user_data).
+    """
+    token = object()
+    with _subscribers_lock:
+        _subscribers[token] = (callback, frozenset(keys) if keys is not None else None)
+
+    def unsubscribe():
+        with _subscribers_lock:
+            _subscribers.pop(token, None)
+
+    return unsubscribe
+
+
+def _publish(keys):
+    changed = frozenset(keys)
+    if not changed:
+        return
+    with _subscribers_lock:
+        subscribers = list(_subscribers.values())
+    for callback, wanted in subscribers:
+        if wanted is None or changed & wanted:
+            try:
+                callback(changed)
+            except Exception as e:
+                print(f"[subscribe] Error in change callback: {e}")
+
+
+def _section_of(key):
+    """Return the section file a top-level key is stored in."""
+    return key if key in SECTIONS else EXTRAS_SECTION
+
+
+def _normalise(data):
+    """user.json holds a one-element list; accept a bare dict too."""
+    if isinstance(data, list):
+        return data
+    elif isinstance(data, dict):
+        return [data]
+    return False
+
+
+class WriteBehind:
+    """
+    Coalesces writes: changes are applied in memory straight away, and the store's
+    _write_pending() runs at most once per `flush_interval` seconds (or on flush()).
+    An interval of 0 writes through immediately.
+    """
+
+    flush_interval = FLUSH_INTERVAL
+
+    def _init_write_behind(self, flush_interval=None):
+        if flush_interval is not None:
+            self.flush_interval = flush_interval
+        self._dirty = False
+        self._flush_timer = None
+
+    def _schedule_flush(self):
+        self._dirty = True
+        if self.flush_interval <= 0:
+            self.flush()
+        elif self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.flush_interval, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self):
+        """Write any pending changes to disk now. Returns False if the write failed."""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty:
+                return True
+            if not self._write_pending():
+                return False
+            self._dirty = False
+            return True
+
+
+class ChangeNotifier:
+    """
+    Defers subscriber notifications until the store's lock is released, so a callback
+    can never block (or deadlock) on a thread that is waiting for the store.
+    Stores guard their state with `with self._locked():` and report changes with
+    _notify(keys); the keys are published when the outermost _locked() block exits.
+    """
+
+    _lock_depth = 0
+    _unpublished = None
+
+    @contextmanager
+    def _locked(self):
+        keys = None
+        self._lock.acquire()
+        self._lock_depth += 1
+        try:
+            yield
+        finally:
+            self._lock_depth -= 1
+            if self._lock_depth == 0:
+                keys, self._unpublished = self._unpublished, None
+            self._lock.release()
+            if keys:
+                _publish(keys)
+
+    def _notify(self, keys):
+        if self._lock_depth == 0:
+            _publish(keys)      # not inside _locked(): nothing to wait for
+            return
+        if self._unpublished is None:
+            self._unpublished = set()
+        self._unpublished.update(keys)
+
+
+class UserDataStore(WriteBehind, ChangeNotifier):
+    """
+    In-process cache of the user data.
+
+    Each top-level section (songs, playlists, settings, song_meta, song_lengths)
+    lives in its own file under USERDATA_DIR, with any other keys sharing
+    extras.json. Sections are parsed once, revalidated with a cheap os.stat
+    (mtime_ns + size) check, and tracked dirty independently, so a settings
+    change only rewrites settings.json. Merges are applied to the cached
+    document and written back behind the caller (see WriteBehind).
+
+    In journaled mode each merge is instead appended as one JSON line to
+    journal.log, replayed over the section snapshots on load, and folded back
+    into them once the log grows past `compact_bytes`. Section files are always
+    replaced atomically, so a crash leaves either the old or the new snapshot.
+
+    A legacy single-file user.json is split into sections on first load.
+    """
+
+    def __init__(self, path=USERDATA_DIR, legacy_path=USERDATA_FILE, flush_interval=None,
+                 journal=JOURNAL_ENABLED, compact_bytes=JOURNAL_COMPACT_BYTES):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._lock = threading.RLock()
+        self._user = None           # merged document; None until loaded
+        self._sigs = {}             # section -> (mtime_ns, size) of the file we parsed
+        self._dirty_sections = set()
+        self._view = None           # frozen copy of the document, built lazily
+        self._frozen = {}           # top-level key -> frozen value, reused across views
+        self.journal = journal
+        self.compact_bytes = compact_bytes
+        self._pending_records = []      # serialised journal lines not yet appended
+        self._unsnapshotted = set()     # sections with changes only in the journal
+        self._journal_sig = None
+        self._init_write_behind(flush_interval)
+
+    # ------------------ section files ------------------
+
+    def _section_path(self, section):
+        return os.path.join(self.path, f"{section}.json")
+
+    def _stat_signature(self, section):
+        try:
+            st = os.stat(self._section_path(section))
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _section_value(self, section):
+        if section == EXTRAS_SECTION:
+            extras = {k: v for k, v in self._user.items() if k not in SECTIONS}
+            return extras or None
+        return self._user.get(section)
+
+    def _read_section(self, section):
+        """Load one section file into the document; returns the top-level keys it touched."""
+        try:
+            with open(self._section_path(section), "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except FileNotFoundError:
+            value = None
+        except Exception as e:
+            print(f"[UserDataStore] Error reading {section} data: {e}")
+            value = None
+
+        if section == EXTRAS_SECTION:
+            keys = {k for k in self._user if k not in SECTIONS}
+            for k in keys:
+                del self._user[k]
+            if isinstance(value, dict):
+                self._user.update(value)
+                keys |= set(value)
+            return keys
+
+        if value is None:
+            self._user.pop(section, None)
         else:
+            self._user[section] = value
+        return {section}
+
+    def _write_section(self, section):
+        path = self._section_path(section)
+        value = self._section_value(section)
+        try:
+            if value is None:
+                if os.path.exists(path):
+                    os.remove(path)
+            else:
+                os.makedirs(self.path, exist_ok=True)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(value, f, indent=4)
+                os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"[UserDataStore] Error saving {section} data: {e}")
             return False
-    except Exception as e:
-        print(f"[getUserData] Error reading user data: {e}")
-        return False
+        self._sigs[section] = self._stat_signature(section)
+        return True
 
+    def _write_pending(self):
+        for section in sorted(self._dirty_sections):
+            if not self._write_section(section):
+                return False
+            self._dirty_sections.discard(section)
+        if self._pending_records and not self._append_journal():
+            return False
+        if self._journal_sig is not None and self._journal_sig[1] > self.compact_bytes:
+            return self._compact()
+        return True
 
-def setUserData(data):
-    """Overwrite user data completely (used only when explicitly resetting all data)."""
-    try:
-        with open(USERDATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
+    # ------------------ journal ------------------
+
+    def _journal_path(self):
+        return os.path.join(self.path, JOURNAL_FILE)
+
+    def _journal_signature(self):
+        try:
+            st = os.stat(self._journal_path())
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _append_journal(self):
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            with open(self._journal_path(), "a", encoding="utf-8") as f:
+                f.write("".join(line + "\n" for line in self._pending_records))
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception as e:
+            print(f"[UserDataStore] Error appending to journal: {e}")
+            return False
+        self._pending_records = []
+        self._journal_sig = self._journal_signature()
         return True
-    except Exception as e:
-        print(f"[setUserData] Error saving data: {e}")
-        return False
 
+    def _replay_journal(self):
+        """Apply the journal's records over the loaded sections; returns the keys touched."""
+        keys = set()
+        try:
+            with open(self._journal_path(), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue    # torn last line from a crash mid-append
+                    if not isinstance(record, dict) or not isinstance(record.get("data"), dict):
+                        continue
+                    data = record["data"]
+                    if record.get("op") == "merge":
+                        keys |= {"songs", "playlists", "settings"} | set(data)
+                        _merge_into(self._user, data)
+                    elif record.get("op") == "remove":
+                        keys |= _remove_from(self._user, data)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[UserDataStore] Error replaying journal: {e}")
+        self._journal_sig = self._journal_signature()
+        self._unsnapshotted.update(_section_of(key) for key in keys)
+        return keys
 
-def addUserData(new_data):
+    def _compact(self):
+        """Fold the journal into fresh section snapshots, then drop it."""
+        self._pending_records = []      # already reflected in the snapshots
+        self._dirty_sections |= self._unsnapshotted
+        self._unsnapshotted = set()
+        for section in sorted(self._dirty_sections):
+            if not self._write_section(section):
+                return False
+            self._dirty_sections.discard(section)
+        try:
+            os.remove(self._journal_path())
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[UserDataStore] Error truncating journal: {e}")
+            return False
+        self._journal_sig = None
+        return True
+
+    def _migrate_legacy(self):
+        """Split a single-file user.json into section files."""
+        try:
+            with open(self.legacy_path, "r", encoding="utf-8") as f:
+                data = _normalise(json.load(f))
+        except Exception as e:
+            print(f"[UserDataStore] Error reading legacy user data: {e}")
+            return
+        if data and isinstance(data[0], dict):
+            self._user = data[0]
+            self._dirty_sections.update(ALL_SECTIONS)
+            self._dirty = True
+            self.flush()
+
+    # ------------------ cache bookkeeping ------------------
+
+    def _touched(self, keys):
+        """Invalidate the frozen copies of `keys` after a change and queue a notification."""
+        for key in keys:
+            self._frozen.pop(key, None)
+        self._view = None
+        self._notify(keys)
+
+    def _mark_dirty(self, keys):
+        self._dirty_sections.update(_section_of(key) for key in keys)
+        self._schedule_flush()
+
+    def _revalidate_journaled(self):
+        """Journaled mode: any outside change means sections + journal are re-read together."""
+        if self._pending_records:
+            return False    # unflushed changes are newer than the files
+        sigs = {section: self._stat_signature(section) for section in ALL_SECTIONS}
+        if sigs == self._sigs and self._journal_signature() == self._journal_sig:
+            return False
+        touched = set(self._user)
+        self._user = {}
+        self._sigs = sigs
+        self._unsnapshotted = set()
+        for section in ALL_SECTIONS:
+            self._read_section(section)
+        self._replay_journal()
+        touched |= set(self._user)
+        self._touched(touched)
+        return True
+
+    def revalidate(self):
+        """Reload any section file that changed on disk since it was last parsed."""
+        with self._locked():
+            if self._user is None:
+                self._user = {}
+                if not os.path.isdir(self.path) and os.path.exists(self.legacy_path):
+                    self._migrate_legacy()
+                    self._touched(set(self._user))
+                elif not self.journal and os.path.exists(self._journal_path()):
+                    # left behind by a journaled session: fold it in before going on
+                    for section in ALL_SECTIONS:
+                        self._sigs[section] = self._stat_signature(section)
+                        self._read_section(section)
+                    self._replay_journal()
+                    self._compact()
+                    self._touched(set(self._user))
+
+            if self.journal:
+                return self._revalidate_journaled()
+
+            touched = set()
+            for section in ALL_SECTIONS:
+                if section in self._dirty_sections:
+                    continue    # unflushed changes are newer than the file
+                sig = self._stat_signature(section)
+                if sig == self._sigs.get(section):
+                    continue
+                self._sigs[section] = sig
+                touched |= self._read_section(section)
+            if touched:
+                self._touched(touched)
+            return bool(touched)
+
+    # ------------------ public API ------------------
+
+    def view(self):
+        """Return a read-only view of the document, or False if not found/invalid."""
+        with self._locked():
+            self.revalidate()
+            if not self._user:
+                return False
+            if self._view is None:
+                for key, value in self._user.items():
+                    if key not in self._frozen:
+                        self._frozen[key] = _freeze(value)
+                self._view = (MappingProxyType({k: self._frozen[k] for k in self._user}),)
+            return self._view
+
+    def load(self):
+        """Return a private mutable copy of the document, or False if not found/invalid."""
+        with self._locked():
+            self.revalidate()
+            if not self._user:
+                return False
+            return [mutable_copy(self._user)]
+
+    def replace(self, data):
+        """Overwrite the whole document on disk and in the cache, bypassing write-behind."""
+        with self._locked():
+            data = _normalise(mutable_copy(data))
+            if not data or not isinstance(data[0], dict):
+                return False
+            self.revalidate()
+            old_keys = set(self._user)
+            self._user = data[0]
+            self._touched(old_keys | set(self._user))
+            self._unsnapshotted.update(ALL_SECTIONS)
+            self._dirty = True
+            if not self._compact():
+                return False
+            return self.flush()
+
+    def merge(self, new_data):
+        """Merge `new_data` into the document (see addUserData); the write happens later."""
+        with self._locked():
+            self.revalidate()
+            new_data = mutable_copy(new_data)
+            keys = {key for key in ("songs", "playlists", "settings") if key not in self._user}
+            keys |= set(new_data)
+            _merge_into(self._user, new_data)
+            self._touched(keys)
+            self._record("merge", new_data, keys)
+            return True
+
+    def remove(self, entries):
+        """Delete entries from the dict sections (see removeUserData); the write happens later."""
+        with self._locked():
+            self.revalidate()
+            entries = mutable_copy(entries)
+            keys = _remove_from(self._user, entries)
+            if keys:
+                self._touched(keys)
+                self._record("remove", entries, keys)
+            return True
+
+    def _record(self, op, data, keys):
+        """Queue a change for persistence: a journal line, or the touched section files."""
+        if self.journal:
+            self._pending_records.append(json.dumps({"op": op, "data": data}, separators=(",", ":")))
+            self._unsnapshotted.update(_section_of(key) for key in keys)
+            self._schedule_flush()
+        else:
+            self._mark_dirty(keys)
+
+
+def _merge_into(user, new_data):
     """
     Safely merge new data into existing user data.
     Does NOT overwrite existing playlists, songs, or settings.
     """
 
-    # Load existing data
-    existing = getUserData()
-    if not existing:
-        # If no data exists yet, start fresh
-        user_data = [{}]
-    else:
-        user_data = existing
-
-    user = user_data[0]
-
     # Ensure all major keys exist
     for key in ("songs", "playlists", "settings"):
         if key not in user:
@@ -82,12 +533,12 @@ def addUserData(new_data):
                         if k not in user["playlists"]:
                             user["playlists"][k] = v
 
-        # Songs
-        elif key == "songs":
-            if not isinstance(user["songs"], dict):
-                user["songs"] = {}
+        # Songs, and the per-path tag/length caches
+        elif key in ("songs", "song_meta", "song_lengths"):
+            if not isinstance(user.get(key), dict):
+                user[key] = {}
             if isinstance(value, dict):
-                user["songs"].update(value)
+                user[key].update(value)
 
         # Settings
         elif key == "settings":
@@ -99,6 +550,129 @@ def addUserData(new_data):
         else:
             user[key] = value
 
-    # Save the merged data
-    setUserData(user_data)
-    return True
\ No newline at end of file
+
+def _remove_from(user, entries):
+    """
+    Delete entries from dict sections, e.g. {"songs": ["song3"], "song_meta": [path]}.
+    Returns the set of top-level keys that actually changed.
+    """
+    changed = set()
+    for key, ids in entries.items():
+        section = user.get(key)
+        if not isinstance(section, dict):
+            continue
+        for k in ids or ():
+            if k in section:
+                del section[k]
+                changed.add(key)
+    return changed
+
+
+store = UserDataStore()
+
+
+def use_backend(name):
+    """Switch the module-level store to the "json" (user.json) or "sqlite" (library.db) backend."""
+    global store
+    store.flush()
+    if name == "sqlite":
+        import libraryDB
+        store = libraryDB.SQLiteUserDataStore()
+    else:
+        store = UserDataStore()
+    return store
+
+
+def getUserData():
+    """Load and return the user's data from disk, or False if not found/invalid."""
+    try:
+        return store.load()
+    except Exception as e:
+        print(f"[getUserData] Error reading user data: {e}")
+        return False
+
+
+def getUserDataView():
+    """
+    Like getUserData(), but returns a cached read-only view instead of a copy.
+    Cheap enough to call from the UI heartbeat.
+    """
+    try:
+        return store.view()
+    except Exception as e:
+        print(f"[getUserDataView] Error reading user data: {e}")
+        return False
+
+
+def revalidate():
+    """Pick up changes made to the files by another process (publishes change events)."""
+    try:
+        return store.revalidate()
+    except Exception as e:
+        print(f"[revalidate] Error reading user data: {e}")
+        return False
+
+
+def setUserData(data):
+    """Overwrite user data completely (used only when explicitly resetting all data)."""
+    try:
+        return store.replace(data)
+    except Exception as e:
+        print(f"[setUserData] Error saving data: {e}")
+        return False
+
+
+def addUserData(new_data):
+    """
+    Safely merge new data into existing user data.
+    Does NOT overwrite existing playlists, songs, or settings.
+    """
+    store.merge(new_data)
+    return True
+
+
+def flush():
+    """Write pending addUserData() changes to disk right away."""
+    try:
+        return store.flush()
+    except Exception as e:
+        print(f"[flush] Error saving data: {e}")
+        return False
+
+
+atexit.register(flush)
+
+
+def removeUserData(entries):
+    """
+    Delete entries from the dict sections of the user data, e.g.
+    removeUserData({"songs": ["song3"], "song_meta": ["/path/to/file.mp3"]}).
+    """
+    try:
+        return store.remove(entries)
+    except Exception as e:
+        print(f"[removeUserData] Error removing data: {e}")
+        return False
+
+
+def hasIndexedQueries():
+    """True when the active backend can answer querySongIds()."""
+    return callable(getattr(store, "query_song_ids", None))
+
+
+def querySongIds(query="", sort="title"):
+    """
+    Return song ids matching `query`, ordered by `sort`, using the backend's indexes.
+    Returns None when the active backend has no query support (plain user.json).
+    """
+    if not hasIndexedQueries():
+        return None
+    try:
+        return store.query_song_ids(query, sort)
+    except Exception as e:
+        print(f"[querySongIds] Error querying songs: {e}")
+        return None
+
+
+if USERDATA_BACKEND == "sqlite":
+    use_backend("sqlite")
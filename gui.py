@@ -33,24 +33,31 @@ Current issues:
 
 import customtkinter as ctk # type: ignore
 import getUserData as gud
+import libraryScanner
+import folderWatcher
+import loudness
+import waveform
+import metaCache
+import songRecord
+import artCache
+import tagPool
 import os
 import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor
 import time
 import logging as lg
 from pathlib import Path
-import shutil
 import sys
 import uuid
-import io
 import requests as rq # type: ignore
 from dotenv import load_dotenv as lenv # type: ignore
-from tkinter import Menu, filedialog
+import tkinter as tk
+from tkinter import Menu, filedialog, font as tkfont
 import importlib
 import pygame # type: ignore
 PygameAvailable = True
 
-from tinytag import TinyTag as tt # type: ignore
-
 NAME = 'PyTunes'
 __version__ = '1.0b4'
 
@@ -143,13 +150,6 @@ except Exception as e:
     PIL_AVAILABLE = False
     l.warning("Pillow not available; album art disabled. (%s)", e)
 
-try:
-    from mutagen import File as MutagenFile  # type: ignore
-
-except Exception:
-    l.warning("Mutagen not available; album art disabled. (%s)")
-    MutagenFile = None
-
 
 global skeleton
 skeleton = {}
@@ -182,6 +182,8 @@ class AudioBackend:
         
         self._current_path = None
         self._is_playing = False
+        self._volume = 1.0
+        self._gain = 1.0    # per-track loudness correction, linear
         self._poll_thread = threading.Thread(target=self._poll_loop, daemon=True)
         self._stop_poll = threading.Event()
         self.position_callback = None
@@ -213,7 +215,16 @@ class AudioBackend:
         self._is_playing = False
 
     def set_volume(self, vol):
-        pygame.mixer.music.set_volume(max(0.0, min(1.0, vol)))
+        self._volume = max(0.0, min(1.0, vol))
+        pygame.mixer.music.set_volume(self._volume * self._gain)
+
+    def set_gain_db(self, gain_db):
+        """
+        Apply a track gain (e.g. from loudness analysis) on top of the user volume.
+        pygame cannot amplify, so positive gains are clamped to unity.
+        """
+        self._gain = min(1.0, 10 ** (float(gain_db or 0.0) / 20))
+        pygame.mixer.music.set_volume(self._volume * self._gain)
 
     def get_pos_seconds(self):
         pos = pygame.mixer.music.get_pos()
@@ -231,107 +242,36 @@ class AudioBackend:
 
 
 def getAudioData(file):
-    return tt.get(file)
+    """Cached single-pass SongRecord (artist/album/year/duration/...) for `file`."""
+    return songRecord.get(file)
+
+
+_album_art_cache = None
+
+
+def album_art_cache():
+    """The process-wide two-level thumbnail cache, created on first use under Images/thumbs."""
+    global _album_art_cache
+    if _album_art_cache is None:
+        _album_art_cache = artCache.ThumbnailCache(get_local_image_dir() / "thumbs")
+    return _album_art_cache
 
 
 def load_album_art(path: str, size: int = 96):
     """
     Return a CTkImage for the embedded cover art or a fallback image.
-    Works across Pillow versions (safe Resampling fallback).
+    Served from the (art hash, size) thumbnail cache; only a miss on both the
+    in-memory LRU and the on-disk thumbnails decodes and scales the original.
     """
     if not PIL_AVAILABLE:
         return None
-    
-    try:
-        from customtkinter import CTkImage  # type: ignore # local import to avoid top-level CTkImage import
 
+    try:
+        return album_art_cache().get(path, size)
     except Exception as e:
-        l.error("CTkImage import failed even though Pillow exists: %s", e)
+        l.error("Album art failed for %s: %s", path, e)
         return None
 
-    img = None
-
-    try:
-        audio = MutagenFile(path) # pyright: ignore[reportOptionalCall, reportPossiblyUnboundVariable]
-        if audio:
-            # MP3 ID3 APIC
-            try:
-                if hasattr(audio, "tags") and hasattr(audio.tags, "getall"):
-                    apics = audio.tags.getall("APIC")
-                    if apics:
-                        art = apics[0].data
-                        img = Image.open(io.BytesIO(art)).convert("RGBA") # pyright: ignore[reportOptionalMemberAccess, reportOptionalCall, reportPossiblyUnboundVariable]
-            except Exception:
-                img = img or None
-
-            # MP4 / M4A covr
-            if img is None:
-                try:
-                    if hasattr(audio, "tags") and audio.tags:
-                        covr = audio.tags.get("covr")
-                        if covr:
-                            # covr entry may be MP4Cover or bytes
-                            art = covr[0]
-                            if hasattr(art, "data"):
-                                art = art.data
-                            img = Image.open(io.BytesIO(art)).convert("RGBA") # pyright: ignore[reportOptionalMemberAccess, reportPossiblyUnboundVariable]
-                except Exception:
-                    img = img or None
-
-            # FLAC pictures
-            if img is None:
-                try:
-                    pics = getattr(audio, "pictures", None)
-                    if pics:
-                        art = pics[0].data
-                        img = Image.open(io.BytesIO(art)).convert("RGBA") # pyright: ignore[reportOptionalMemberAccess, reportPossiblyUnboundVariable]
-                except Exception:
-                    img = img or None
-    except Exception:
-        try:
-            imageFileRQ = rq.get(path).content
-            img = Image.open(io.BytesIO(imageFileRQ)).convert("RGBA") # type: ignore
-
-        except:
-            img = None
-
-    # Fallback to cover.jpg/folder.jpg next to the file
-    if img is None and path:
-        try:
-            parent = Path(path).parent
-            for name in ("cover.jpg", "folder.jpg", "cover.png", "folder.png"):
-                candidate = parent / name
-                if candidate.exists():
-                    img = Image.open(candidate).convert("RGBA") # pyright: ignore[reportOptionalMemberAccess, reportPossiblyUnboundVariable]
-                    break
-        except Exception:
-            img = None
-
-    # Final placeholder: use RGB to avoid typing issues with RGBA tuples
-    if img is None:
-        img = Image.new("RGB", (size, size), (50, 50, 50)) # pyright: ignore[reportOptionalMemberAccess, reportPossiblyUnboundVariable]
-
-    # Choose resampling filter compatibly across Pillow versions
-    try:
-        resample = Image.Resampling.LANCZOS  # Pillow >= 9.1 # pyright: ignore[reportOptionalMemberAccess, reportPossiblyUnboundVariable]
-    except Exception:
-        # fallback for older Pillow
-        resample = getattr(Image, "LANCZOS", Image.ANTIALIAS) # pyright: ignore[reportOptionalMemberAccess, reportAttributeAccessIssue, reportPossiblyUnboundVariable]
-
-    # Fit/crop to square thumbnail consistently
-    try:
-        img_thumb = ImageOps.fit(img, (size, size), method=resample) # pyright: ignore[reportOptionalMemberAccess, reportPossiblyUnboundVariable]
-    except TypeError:
-        # older ImageOps might expect 'method' positional name 'resample' — try both
-        try:
-            img_thumb = ImageOps.fit(img, (size, size), resample=resample) # pyright: ignore[reportOptionalMemberAccess, reportCallIssue, reportPossiblyUnboundVariable]
-        except Exception:
-            # final fallback: simple resize
-            img_thumb = img.resize((size, size), resample)
-
-    # Return CTkImage (works for both light and dark modes)
-    return CTkImage(light_image=img_thumb, dark_image=img_thumb, size=(size, size))
-
 
 
 
@@ -486,9 +426,14 @@ class createSideWindow(ctk.CTkFrame):
         )
         self.gotoLibrary.grid(row=1, column=0, sticky="ew", pady=10, ipady=10)
 
+        # rebuild playlist buttons whenever the playlists section changes
+        if hasattr(controller, "watch_user_data"):
+            controller.watch_user_data(self, lambda changed: self._refresh_playlists(), ("playlists",))
+        self._refresh_playlists()
+
 
     def refresh_tick(self):
-        """Called every ~100ms by App._heartbeat."""
+        """Called every second by App._heartbeat."""
         # update the little clock so you can see it moving
         try:
             # show seconds only to avoid flicker
@@ -496,21 +441,14 @@ class createSideWindow(ctk.CTkFrame):
         except Exception:
             pass
 
-        # check playlists; rebuild only on change
-        try:
-            self._refresh_playlists()
-        except Exception:
-            pass
-
 
     def _refresh_playlists(self, force=False):
         """Rebuild playlist buttons when user data changes."""
-        userdata = gud.getUserData()
-        if not userdata or not isinstance(userdata, list):
+        userdata = gud.getUserDataView()
+        if not userdata:
             return
 
         playlists = userdata[0].get('playlists', {}) or {}
-        songs_data = userdata[0].get('songs', {}) or {}
 
         # stable signature for change detection
         current = sorted(
@@ -541,7 +479,7 @@ class createSideWindow(ctk.CTkFrame):
                 hover_color='#555555',
                 corner_radius=10,
                 font=('Helvetica', 16),
-                command=lambda pid=pid, pdata=playlists[pid]: self.controller.show_playlist(pid, pdata, songs_data)
+                command=lambda pid=pid: self._open_playlist(pid)
             )
             btn.grid(row=next_row, column=0, sticky="ew", pady=5, ipady=10)
             self._playlist_btns.append(btn)
@@ -549,6 +487,16 @@ class createSideWindow(ctk.CTkFrame):
 
         self._pl_cache = current
 
+    def _open_playlist(self, pid):
+        """Show a playlist using the user data as it is right now."""
+        userdata = gud.getUserDataView()
+        if not userdata:
+            return
+        playlists = userdata[0].get('playlists', {}) or {}
+        songs_data = userdata[0].get('songs', {}) or {}
+        if pid in playlists:
+            self.controller.show_playlist(pid, gud.mutable_copy(playlists[pid]), gud.mutable_copy(songs_data))
+
 
 
     
@@ -676,7 +624,8 @@ class pageAddMusic(ctk.CTkFrame):
 
     def add_songs_to_playlist(self):
         """
-        Scan Music/ and add files to the in-memory skeleton, then persist via gud.addUserData().
+        Persist the default skeleton via gud.addUserData(), then add the files in Music/
+        through the incremental library scanner.
         Robust against an empty `skeleton` or missing keys in a fresh user.json.
         """
         # ensure skeleton has the expected shape
@@ -692,57 +641,17 @@ class pageAddMusic(ctk.CTkFrame):
             'loop': False,
         }))
 
-        # find all files in Music folder
-        paths = [str(p.resolve()) for p in Path('Music').rglob('*') if p.is_file()]
-
-        # If there are no paths, still persist the (possibly-defaulted) skeleton and return
-        if not paths:
-            try:
-                gud.addUserData(skeleton)
-            except Exception as e:
-                l.error("Failed to save skeleton for empty music folder: %s", e)
-            return
-
-        # Determine starting index for new song ids (avoid clobbering existing keys)
-        existing = skeleton.get('songs', {}) or {}
-        # collect numeric suffixes from existing keys like 'song0', 'song12'
-        max_idx = -1
-        import re
-        for k in existing.keys():
-            m = re.fullmatch(r"song(\d+)", k)
-            if m:
-                try:
-                    idx = int(m.group(1))
-                    if idx > max_idx:
-                        max_idx = idx
-                except Exception:
-                 pass
-        start_idx = max_idx + 1
-
-        # Add paths into skeleton['songs'] with stable keys
+        # persist the (possibly-defaulted) skeleton first
         try:
-            for offset, p in enumerate(paths):
-                idx = start_idx + offset
-                name_part = os.path.splitext(os.path.basename(p))[0]
-                skeleton['songs'][f"song{idx}"] = {
-                    'name': name_part,
-                    'loc': os.path.abspath(p)
-                }
-
-            # persist the skeleton
-            try:
-                gud.addUserData(skeleton)
-            except Exception as e:
-                l.error("Failed to write user data after adding songs: %s", e)
-
+            gud.addUserData(skeleton)
         except Exception as e:
-            l.exception("Unexpected error while adding songs to skeleton: %s", e)
+            l.error("Failed to save skeleton: %s", e)
 
-            try:
-                gud.addUserData(skeleton)
-
-            except Exception as e2:
-                l.error("Failed to save skeleton after exception: %s", e2)
+        # then add whatever is in the Music folder
+        try:
+            libraryScanner.sync_library()
+        except Exception as e:
+            l.exception("Unexpected error while adding songs from the Music folder: %s", e)
 
 
     def on_finish_clicked(self):
@@ -1014,24 +923,21 @@ class createNewPlaylist(ctk.CTkToplevel):
             "songs": selected_ids,
         }
 
-        # --- copy chosen icon into local ./Images folder ---
+        # --- normalise the chosen icon into ready-sized variants in ./Images ---
         src_icon = getattr(self, "selected_icon_path", None)
         if src_icon:
             try:
-                src_path = Path(src_icon)
-                ext = src_path.suffix or ".png"
                 img_dir = get_local_image_dir()
-                target_path = img_dir / f"{new_pid}{ext}"
+                stem = new_pid
+                if any(img_dir.glob(f"{stem}_*")):
+                    stem = f"{new_pid}_{uuid.uuid4().hex}"
 
-                # if collision, append random uuid
-                if target_path.exists():
-                    target_path = img_dir / f"{new_pid}_{uuid.uuid4().hex}{ext}"
-
-                shutil.copy2(str(src_path), str(target_path))
-                new_entry["icon"] = str(target_path.resolve())
+                variants = artCache.make_icon_set(src_icon, img_dir, stem)
+                new_entry["icon"] = variants["header"]
+                new_entry["icon_sizes"] = variants
 
             except Exception as e:
-                l.error("Failed to copy playlist icon into local Images folder: %s", e)
+                l.error("Failed to store playlist icon in local Images folder: %s", e)
                 # fallback: still store original path
                 new_entry["icon"] = src_icon
 
@@ -1049,37 +955,387 @@ class createNewPlaylist(ctk.CTkToplevel):
 
 
 
+class RowDiff:
+    """
+    Minimal edit between two orderings of unique ids: rows removed (old
+    indexes), inserted (new indexes), moved ((old, new) pairs), and `kept`,
+    old index -> new index for every row that survives, moved or not.
+    """
+    __slots__ = ("removed", "inserted", "moved", "kept")
+
+    def __init__(self, removed, inserted, moved, kept):
+        self.removed = removed
+        self.inserted = inserted
+        self.moved = moved
+        self.kept = kept
+
+    def __len__(self):
+        return len(self.removed) + len(self.inserted) + len(self.moved)
+
+
+def diff_ids(old, new):
+    """
+    Diff two id sequences in O(n log n). Rows present in both stay put if they
+    lie on the longest run whose relative order is unchanged; the rest are
+    moves, so a re-sort shows up as moves and a search as inserts/removes.
+    """
+    from bisect import bisect_left
+
+    new_pos = {sid: j for j, sid in enumerate(new)}
+    removed = [i for i, sid in enumerate(old) if sid not in new_pos]
+    kept = {i: new_pos[sid] for i, sid in enumerate(old) if sid in new_pos}
+    old_ids = set(old)
+    inserted = [j for j, sid in enumerate(new) if sid not in old_ids]
+
+    # longest increasing subsequence of new positions, in old order
+    olds = list(kept)
+    tails, tail_at, parent = [], [], [-1] * len(olds)
+    for k, i in enumerate(olds):
+        j = kept[i]
+        at = bisect_left(tails, j)
+        if at == len(tails):
+            tails.append(j)
+            tail_at.append(k)
+        else:
+            tails[at] = j
+            tail_at[at] = k
+        parent[k] = tail_at[at - 1] if at else -1
+    steady = set()
+    k = tail_at[-1] if tail_at else -1
+    while k != -1:
+        steady.add(olds[k])
+        k = parent[k]
+
+    moved = [(i, kept[i]) for i in olds if i not in steady]
+    return RowDiff(removed, inserted, moved, kept)
+
+
+class TrackTable(ctk.CTkFrame):
+    """
+    Lightweight track list drawn on a single tk.Canvas: each row is a
+    rectangle plus one text item per column, and one set of canvas bindings
+    maps y-coordinates back to rows. Only rows in view (plus OVERSCAN) have
+    items; they are pooled, so a row leaving the view hands its items to the
+    next one entering, and a row that merely shifts (after a diff) keeps them.
+    Scrolling is the canvas's own yview, so rows that stay on screen are not
+    touched at all.
+
+    Rows are tuples of column texts; with `numbered` the first column shows the
+    row number and rows hold the remaining columns. Row numbers passed in and
+    out are 1-based, like showLibrary's table_index.
+    """
+
+    OVERSCAN = 4
+    WHEEL_ROWS = 3
+    TEXT_COLOR = "#DCE4EE"
+
+    def __init__(self, parent, column_weights, row_height=40, font=("Helvetica", 16),
+                 row_bg="#2b2b2b", hover_bg="#3a3a3a", active_bg="#696969", numbered=True,
+                 on_click=None, on_rclick=None, on_scroll=None, empty_text=""):
+        super().__init__(parent, fg_color="transparent")
+        self.column_weights = tuple(column_weights)
+        self.row_height = row_height
+        self.font = tkfont.Font(family=font[0], size=font[1])
+        self.row_bg, self.hover_bg, self.active_bg = row_bg, hover_bg, active_bg
+        self.numbered = numbered
+        self.on_click = on_click
+        self.on_rclick = on_rclick
+        self.on_scroll = on_scroll
+
+        self.rows = []              # column texts per row, in display order
+        self._slot_of = {}          # row index -> slot showing it
+        self._free = []             # slots not showing anything
+        self._highlights = {}       # kind ("selected", "playing") -> row number
+        self._hover = None          # row number under the pointer
+        self._width = 1
+        self._fit_cache = {}        # (text, column) -> text cut to the column width
+        self.configured = 0         # text items changed so far (cost of updates)
+
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+        self.canvas = tk.Canvas(self, highlightthickness=0, bd=0, yscrollincrement=row_height,
+                                bg=self._canvas_bg(), yscrollcommand=self._on_yscroll)
+        self.canvas.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.canvas.yview)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self._empty = self.canvas.create_text(0, 22, text=empty_text, anchor="n", fill=self.TEXT_COLOR,
+                                              font=self.font, state="hidden")
+
+        total = float(sum(self.column_weights)) or 1.0
+        self._columns = []          # (relx, relwidth) per column
+        x = 0.0
+        for w in self.column_weights:
+            self._columns.append((x, w / total))
+            x += w / total
+
+        # one set of bindings for every row
+        self.canvas.bind("<Configure>", self._on_configure)
+        self.canvas.bind("<Button-1>", lambda e: self._dispatch(self.on_click, e))
+        self.canvas.bind("<Button-3>", lambda e: self._dispatch(self.on_rclick, e))
+        self.canvas.bind("<Motion>", lambda e: self._set_hover(self._row_at(e)))
+        self.canvas.bind("<Leave>", lambda e: self._set_hover(None))
+        self.canvas.bind("<MouseWheel>", self._on_wheel)
+        self.canvas.bind("<Button-4>", lambda e: self.canvas.yview_scroll(-self.WHEEL_ROWS, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.canvas.yview_scroll(self.WHEEL_ROWS, "units"))
+
+    # ------------------ public API ------------------
+
+    def set_rows(self, rows, keep_offset=False):
+        """Show `rows` (tuples of column texts); highlights are cleared."""
+        self.rows = list(rows)
+        self._highlights.clear()
+        self._hover = None
+        self._resize()
+        if not keep_offset:
+            self.canvas.yview_moveto(0)
+        self._layout()
+
+    def apply_diff(self, rows, diff):
+        """
+        Switch to `rows`, the result of `diff` (see diff_ids) applied to the
+        current rows. Rows still on screen keep their items and highlights
+        follow their rows; only appearing rows and changed texts are redrawn.
+        """
+        slot_of = {}
+        for r, slot in self._slot_of.items():
+            nr = diff.kept.get(r)
+            if nr is None:
+                self._release(slot)
+            else:
+                slot_of[nr] = slot
+                slot["row"] = nr
+        self._slot_of = slot_of
+        self._highlights = {
+            kind: diff.kept[n - 1] + 1 for kind, n in self._highlights.items() if n - 1 in diff.kept
+        }
+        self._hover = None
+        self.rows = list(rows)
+        self._resize()
+        self._layout()
+
+    def update_row(self, number, values):
+        """Replace the texts of one row; redrawn only if it is in view."""
+        if 1 <= number <= len(self.rows):
+            self.rows[number - 1] = tuple(values)
+            slot = self._slot_of.get(number - 1)
+            if slot is not None:
+                self._paint(slot, number - 1)
+
+    def set_highlight(self, kind, number):
+        """Mark row `number` as `kind` ("selected"/"playing"); None clears it."""
+        previous = self._highlights.pop(kind, None)
+        if number is not None and 1 <= number <= len(self.rows):
+            self._highlights[kind] = number
+        self._repaint(previous, number)
+
+    def visible_range(self):
+        """(first, last) 1-based row numbers currently on screen."""
+        top = int(self.canvas.canvasy(0))
+        height = max(1, self.canvas.winfo_height())
+        return top // self.row_height + 1, min(len(self.rows), (top + height) // self.row_height + 1)
+
+    def see(self, number):
+        """Scroll just enough for row `number` to be fully visible."""
+        top = int(self.canvas.canvasy(0))
+        height = max(1, self.canvas.winfo_height())
+        y = (number - 1) * self.row_height
+        total = max(1, len(self.rows) * self.row_height)
+        if y < top:
+            self.canvas.yview_moveto(y / total)
+        elif y + self.row_height > top + height:
+            self.canvas.yview_moveto((y + self.row_height - height) / total)
+
+    # ------------------ layout ------------------
+
+    def _canvas_bg(self):
+        try:
+            return self._apply_appearance_mode(self._detect_color_of_master())
+        except Exception:
+            return "#242424"
+
+    def _set_appearance_mode(self, mode_string):
+        super()._set_appearance_mode(mode_string)
+        self.canvas.configure(bg=self._canvas_bg())
+
+    def _resize(self):
+        total = len(self.rows) * self.row_height
+        self.canvas.configure(scrollregion=(0, 0, self._width, max(total, 1)))
+        self.canvas.itemconfigure(self._empty, state="hidden" if self.rows else "normal")
+
+    def _on_configure(self, event):
+        if event.width != self._width:
+            self._width = event.width
+            self._fit_cache.clear()
+            self.canvas.coords(self._empty, event.width / 2, 22)
+            for slot in self._slot_of.values():
+                slot["y"] = None            # re-place and re-fit at the new width
+                slot["texts"] = [None] * len(self._columns)
+            self._resize()
+        self._layout()
+
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self._layout()
+        if self.on_scroll is not None:
+            self.on_scroll()
+
+    def _layout(self):
+        top = int(self.canvas.canvasy(0))
+        height = max(1, self.canvas.winfo_height())
+        first = max(0, top // self.row_height - self.OVERSCAN)
+        last = min(len(self.rows), (top + height) // self.row_height + 1 + self.OVERSCAN)
+        for r in [r for r in self._slot_of if not first <= r < last]:
+            self._release(self._slot_of.pop(r))
+        for r in range(first, last):
+            slot = self._slot_of.get(r)
+            if slot is None:
+                slot = self._free.pop() if self._free else self._make_slot()
+                self._slot_of[r] = slot
+            self._paint(slot, r)
+
+    def _release(self, slot):
+        for item in [slot["rect"]] + slot["items"]:
+            self.canvas.itemconfigure(item, state="hidden")
+        slot["row"] = None
+        slot["y"] = None
+        self._free.append(slot)
+
+    def _make_slot(self):
+        rect = self.canvas.create_rectangle(0, 0, 0, 0, fill=self.row_bg, outline="")
+        items = [self.canvas.create_text(0, 0, text="", anchor="w", fill=self.TEXT_COLOR, font=self.font)
+                 for _column in self._columns]
+        return {"rect": rect, "items": items, "texts": [None] * len(items), "row": None, "y": None,
+                "color": self.row_bg}
+
+    def _paint(self, slot, r):
+        """Bring a slot up to date with row index `r`; only what differs is changed on the canvas."""
+        canvas = self.canvas
+        slot["row"] = r
+        y = r * self.row_height
+        if slot["y"] != y:
+            if slot["y"] is None:
+                for item in [slot["rect"]] + slot["items"]:
+                    canvas.itemconfigure(item, state="normal")
+            canvas.coords(slot["rect"], 0, y + 1, self._width, y + self.row_height - 1)
+            for (relx, _relwidth), item in zip(self._columns, slot["items"]):
+                canvas.coords(item, relx * self._width + 8, y + self.row_height / 2)
+            slot["y"] = y
+
+        texts = ((str(r + 1),) + tuple(self.rows[r])) if self.numbered else self.rows[r]
+        for c, (item, text) in enumerate(zip(slot["items"], texts)):
+            text = self._fit(text, c)
+            if slot["texts"][c] != text:
+                canvas.itemconfigure(item, text=text)
+                slot["texts"][c] = text
+                self.configured += 1
+
+        number = r + 1
+        if number in self._highlights.values():
+            color = self.active_bg
+        elif number == self._hover:
+            color = self.hover_bg
+        else:
+            color = self.row_bg
+        if slot["color"] != color:
+            canvas.itemconfigure(slot["rect"], fill=color)
+            slot["color"] = color
+
+    def _fit(self, text, column):
+        """`text` cut with an ellipsis to the width of `column`."""
+        key = (text, column)
+        fitted = self._fit_cache.get(key)
+        if fitted is None:
+            room = self._columns[column][1] * self._width - 14
+            fitted = text
+            if self.font.measure(text) > room:
+                lo, hi = 0, len(text)
+                while lo < hi:
+                    mid = (lo + hi + 1) // 2
+                    if self.font.measure(text[:mid] + "…") <= room:
+                        lo = mid
+                    else:
+                        hi = mid - 1
+                fitted = text[:lo] + "…"
+            if len(self._fit_cache) > 4096:
+                self._fit_cache.clear()
+            self._fit_cache[key] = fitted
+        return fitted
+
+    def _repaint(self, *numbers):
+        for n in numbers:
+            slot = self._slot_of.get(n - 1) if n else None
+            if slot is not None:
+                self._paint(slot, n - 1)
+
+    # ------------------ events ------------------
+
+    def _row_at(self, event):
+        r = int(self.canvas.canvasy(event.y)) // self.row_height
+        return r if 0 <= r < len(self.rows) else None
+
+    def _dispatch(self, handler, event):
+        r = self._row_at(event)
+        if handler is not None and r is not None:
+            handler(r + 1, event)
+
+    def _set_hover(self, r):
+        number = r + 1 if r is not None else None
+        if number != self._hover:
+            previous, self._hover = self._hover, number
+            self._repaint(previous, number)
+
+    def _on_wheel(self, event):
+        if not event.delta:
+            return
+        # Windows reports multiples of 120, macOS small deltas
+        steps = event.delta / 120 if abs(event.delta) >= 120 else event.delta
+        self.canvas.yview_scroll(-int(steps * self.WHEEL_ROWS) or (-1 if steps > 0 else 1), "units")
+
+
+
 class showLibrary(ctk.CTkFrame):
     """
     Library view with search, sorting, cached song length & metadata lookup,
-    plus debounce + diffing + double-buffer swapping to avoid flicker.
+    plus debounce. Rows are drawn by a TrackTable, so only the rows on
+    screen have widgets however large the library is, and a new search/sort
+    result is applied as a diff against the rows already shown.
     """
 
     ROW_BG = "#2b2b2b"
     ROW_HOVER_BG = "#3a3a3a"
     ROW_ACTIVE_BG = "#696969"
     ROW_HEIGHT = 40
+    BUILD_SLICE_MS = 8      # row-model construction per event-loop turn
 
     column_weights = (6, 40, 20, 28, 6)
 
-    def __init__(self, parent, controller):
+    def __init__(self, parent, controller, song_source=None):
         super().__init__(parent)
         self.controller = controller
         self.audio = getattr(self.controller, "audio", None)
+        # callable returning the songs dict to list; the whole library by default
+        self.song_source = song_source
 
-        # length cache (persisted in userData under "song_lengths")
+        # per-view memo of metaCache lookups (which persists and validates them)
         self._length_cache = {}
         # metadata cache: {path: {"artist": str, "album": str}}
         self._meta_cache = {}
-        try:
-            data = gud.getUserData()[0]  # type: ignore
-            self._length_cache = dict(data.get("song_lengths", {}))
-            self._meta_cache = dict(data.get("song_meta", {}))
-        except Exception:
-            self._length_cache = {}
-            self._meta_cache = {}
 
         # debounce / rate-limit variables
+        # files are never parsed on the Tk thread: rows missing tags show placeholders,
+        # are queued on the controller's prefetcher and filled in as batches arrive
+        self._awaiting_meta = set()
+        self._requested_meta = set()
+        self._rows_by_path = {}
+        # row models by song id, reused across rebuilds (see _row_for)
+        self._row_cache = {}
+        self._row_ids_by_path = {}
+        # progressive build state: rows not built yet, the pending after() and its token
+        self._build_pending = []
+        self._build_after = None
+        self._build_token = 0
+        self.build_stats = {}   # rows / built / slices / total_ms of the last build
+
         self._songs_sig = None
         self._last_rebuild_ms = 0
         self._min_rebuild_ms = 400  # <- throttle to 400ms to reduce flicker
@@ -1118,15 +1374,15 @@ class showLibrary(ctk.CTkFrame):
         self.separator = ctk.CTkFrame(self, fg_color="#444444", height=5)
         self.separator.grid(row=1, column=0, sticky="ew", padx=self.outer_padx, pady=(0, 6))
 
-        # Scrollable area
-        self.scroll_area = ctk.CTkScrollableFrame(self, fg_color="transparent")
-        self.scroll_area.grid(row=2, column=0, sticky="nsew", padx=self.outer_padx, pady=(0,12))
-        self.scroll_area.grid_rowconfigure(0, weight=1)
-        self.scroll_area.grid_columnconfigure(0, weight=1)
-
-        # list_container will be swapped with new frames for double buffering
-        self.list_container = ctk.CTkFrame(self.scroll_area, fg_color="transparent")
-        self.list_container.grid(row=0, column=0, sticky="nsew")
+        # song list drawn on one canvas; only on-screen rows have canvas items
+        self.table = TrackTable(
+            self, self.column_weights, row_height=self.ROW_HEIGHT,
+            row_bg=self.ROW_BG, hover_bg=self.ROW_HOVER_BG, active_bg=self.ROW_ACTIVE_BG,
+            on_click=self._on_row_click, on_rclick=self._on_row_rclick,
+            on_scroll=self._on_table_scroll, empty_text="No songs in library.",
+        )
+        self.table.grid(row=2, column=0, sticky="nsew", padx=self.outer_padx, pady=(0,12))
+        self._scroll_after = None
 
         self.rightSideWindow = ctk.CTkScrollableFrame(self, width=250, fg_color='transparent', scrollbar_fg_color='transparent')
         self.rightSideWindow.grid(row=2, column=1, sticky='nsw')
@@ -1171,15 +1427,12 @@ class showLibrary(ctk.CTkFrame):
         self.artistBio.grid(row=0, column=0, sticky='nsw')
 
 
-        for col, w in enumerate(self.column_weights):
-            self.list_container.grid_columnconfigure(col, weight=w)
-
-
-        self.row_bg_frames = []
-        self.row_widgets = []
         self.table_index = {}
         self.selected_index = None
 
+        # rebuild when the song list changes (tag/length cache writes come from this view itself)
+        if hasattr(self.controller, "watch_user_data"):
+            self.controller.watch_user_data(self, self._on_songs_changed, ("songs",))
 
         self._try_build_from_userdata()
 
@@ -1188,13 +1441,82 @@ class showLibrary(ctk.CTkFrame):
     def _now_ms(self):
         return int(time.monotonic() * 1000)
 
-    def refresh_tick(self):
-        # called by your heartbeat; this is throttled inside _try_build_from_userdata
+    def _on_songs_changed(self, changed):
+        # published by the data layer; this is throttled inside _try_build_from_userdata
         self._try_build_from_userdata()
 
     def on_setup_changed(self):
         self._try_build_from_userdata(force=True)
 
+    def on_tag_scan_progress(self, done, total):
+        try:
+            self.duration_label.configure(text=f"Reading tags… {done}/{total}")
+        except Exception:
+            pass
+
+    def on_tag_scan_done(self):
+        self._try_build_from_userdata(force=True)
+
+    def on_metadata_ready(self, paths):
+        """Fill in rows whose tags just arrived; re-sort once nothing is missing any more."""
+        for path in paths:
+            # re-read files may have new tags; drop what this view remembered
+            self._meta_cache.pop(path, None)
+            self._length_cache.pop(path, None)
+            if path not in self._rows_by_path:
+                for sid in self._row_ids_by_path.pop(path, ()):
+                    self._row_cache.pop(sid, None)
+        arrived = self._awaiting_meta.intersection(paths)
+        self._awaiting_meta.difference_update(arrived)
+        for path in paths:
+            # placeholders and rows shown from a stale cache entry alike
+            for idx in self._rows_by_path.get(path, ()):
+                self._fill_row(idx, path)
+        if not arrived:
+            return
+
+        q = (self.search_var.get() or "").strip()
+        sort_key = (self.sort_var.get() or "Title").lower()
+        if not self._awaiting_meta and (q or sort_key in ("artist", "album", "length")):
+            self._try_build_from_userdata(force=True)
+
+    def _fill_row(self, idx, path):
+        artist, album = self._get_meta_for_path(path)
+        length_secs = self._get_length(path)
+        length_str = f"{int(length_secs // 60):02}:{int(length_secs % 60):02}"
+        try:
+            row = self.table_index[idx]
+            row.update({"artist": artist or "Unknown", "album": album or "Unknown", "length": length_str})
+            self.table.update_row(idx, self._row_texts(row))
+        except Exception:
+            pass
+
+    @staticmethod
+    def _row_texts(row):
+        return (row["title"], row["artist"], row["album"], row["length"])
+
+    def _request_missing_metadata(self, ordered_ids, songs):
+        """Queue tag reads for rows still showing placeholders, on-screen rows first."""
+        if not self._awaiting_meta or not hasattr(self.controller, "request_metadata"):
+            return
+        in_order = []
+        for sid in ordered_ids:
+            path = (songs.get(sid) or {}).get("loc", "")
+            if path in self._awaiting_meta and path not in self._requested_meta:
+                in_order.append(path)
+        in_order_set = set(in_order)
+        rest = [p for p in self._awaiting_meta if p not in self._requested_meta and p not in in_order_set]
+
+        try:
+            visible_rows = max(1, self.table.winfo_height() // self.ROW_HEIGHT + 1)
+        except Exception:
+            visible_rows = 20
+        self.controller.request_metadata(in_order[:visible_rows], urgent=True)
+        self.controller.request_metadata(in_order[visible_rows:] + rest)
+        # each path is asked for once; the folder watcher re-queues files that change
+        self._requested_meta.update(in_order)
+        self._requested_meta.update(rest)
+
     def _songs_signature(self, songs: dict) -> tuple:
         items = []
         for sid, sdata in songs.items():
@@ -1210,14 +1532,19 @@ class showLibrary(ctk.CTkFrame):
 
     # data fetch + debounce + diff detection
     def _try_build_from_userdata(self, force: bool = False):
-        try:
-            data = gud.getUserData()
-        except Exception:
-            data = None
-
         songs = {}
-        if data and isinstance(data, (list, tuple)) and len(data) > 0:
-            songs = data[0].get("songs", {}) or {}
+        if self.song_source is not None:
+            try:
+                songs = self.song_source() or {}
+            except Exception as e:
+                l.error("Failed to collect songs for the list: %s", e)
+        else:
+            try:
+                data = gud.getUserDataView()
+            except Exception:
+                data = None
+            if data and isinstance(data, (list, tuple)) and len(data) > 0:
+                songs = data[0].get("songs", {}) or {}
 
         new_sig = self._songs_signature(songs)
         now_ms = self._now_ms()
@@ -1238,13 +1565,14 @@ class showLibrary(ctk.CTkFrame):
         # refresh summary label
         try:
             num_songs = len(songs)
-            hours, minutes = self.get_library_duration() # type: ignore
+            hours, minutes = self.get_library_duration()
             self.duration_label.configure(text=f"{num_songs} Songs • {hours}hrs {minutes}mins")
         except Exception:
             pass
 
         # filter/sort and perform diff-based rebuild
         ordered_ids = self._build_rows_filtered_and_sorted(songs)
+        self._request_missing_metadata(ordered_ids, songs)
 
         # If the ordered id list is identical to currently displayed AND
         # the filter state hasn't changed, skip rebuilding UI entirely.
@@ -1252,15 +1580,31 @@ class showLibrary(ctk.CTkFrame):
         if ordered_ids == self._displayed_ids and current_filter_state == self._last_filter_state:
             return
 
-        # store last filter state and displayed ids
+        # store last filter state; the displayed ids are updated by the diff
         self._last_filter_state = current_filter_state
-        self._displayed_ids = ordered_ids
-
-        # build UI into temporary frame and swap (double-buffer)
-        self._swap_in_new_list_frame(ordered_ids, songs)
+        self._show_ordered_ids(ordered_ids, songs)
 
     # returns ordered list of ids (for diff)
     def _build_rows_filtered_and_sorted(self, songs: dict):
+        q = (self.search_var.get() or "").strip().lower()
+        sort_key = (self.sort_var.get() or "Title").lower()
+
+        # indexed backends answer filter + sort with one query; songs whose tags are
+        # not cached yet are queued here and the query re-runs once they arrive
+        if gud.hasIndexedQueries():
+            for meta in songs.values():
+                path = (meta or {}).get("loc", "") or ""
+                self._get_meta_for_path(path)
+                if sort_key == "length":
+                    self._get_length(path)
+            queried = gud.querySongIds(q, sort_key)
+            if queried is not None:
+                return [sid for sid in queried if sid in songs]
+
+        # plain group-by sorts come straight from the aggregation index
+        if not q and sort_key in ("artist", "album"):
+            return self._ordered_by_group(songs, sort_key)
+
         items = []
         for sid, meta in songs.items():
             title = (meta or {}).get("name", "") or ""
@@ -1269,7 +1613,6 @@ class showLibrary(ctk.CTkFrame):
             artist, album = self._get_meta_for_path(path)
             items.append((sid, title, artist, album, meta, path))
 
-        q = (self.search_var.get() or "").strip().lower()
         if q:
             filtered = []
             for it in items:
@@ -1278,7 +1621,6 @@ class showLibrary(ctk.CTkFrame):
                     filtered.append(it)
             items = filtered
 
-        sort_key = (self.sort_var.get() or "Title").lower()
         if sort_key == "title":
             items.sort(key=lambda x: (x[1].lower(), x[0]))
         elif sort_key == "artist":
@@ -1291,9 +1633,37 @@ class showLibrary(ctk.CTkFrame):
         ordered_ids = [sid for sid, *_ in items]
         return ordered_ids
 
+    def _ordered_by_group(self, songs: dict, by: str):
+        """Order song ids by artist/album group, then title, without per-row tag lookups."""
+        ids_by_path = {}
+        for sid, meta in songs.items():
+            ids_by_path.setdefault((meta or {}).get("loc", "") or "", []).append(sid)
+
+        def by_title(sid):
+            return (((songs.get(sid) or {}).get("name", "") or "").lower(), sid)
+
+        ordered = []
+        for paths in metaCache.get_cache().groups(by):
+            group = [sid for p in paths for sid in ids_by_path.pop(p, ())]
+            group.sort(key=by_title)
+            ordered.extend(group)
+
+        # anything not indexed yet has no tags: it sorts first, like an empty artist/album
+        untagged = []
+        for path, sids in ids_by_path.items():
+            self._get_meta_for_path(path)   # queues the tag read
+            untagged.extend(sids)
+        untagged.sort(key=by_title)
+        return untagged + ordered
+
+    def get_library_duration(self) -> tuple[int, int]:
+        """Return (hours, minutes) total duration of every track with cached tags."""
+        total_seconds = int(metaCache.get_cache().total_duration())
+        return total_seconds // 3600, (total_seconds % 3600) // 60
+
     # length cache helpers
     def _get_length(self, path: str) -> float:
-        """Return cached or computed song length (seconds)."""
+        """Return the cached song length (seconds); 0.0 while it is still being read."""
         if not path:
             return 0.0
         if path in self._length_cache:
@@ -1301,29 +1671,21 @@ class showLibrary(ctk.CTkFrame):
                 return float(self._length_cache[path])
             except Exception:
                 return 0.0
-        try:
-            from mutagen import File as MutaFile # type: ignore
-            mf = MutaFile(path)
-            if mf and getattr(mf, "info", None):
-                length = float(mf.info.length)
-                self._length_cache[path] = length
-                
-                try:
-                    data = gud.getUserData()[0] # type: ignore
-                    data["song_lengths"] = self._length_cache
-                    gud.addUserData(data)
-                except Exception:
-                    pass
-                return length
-        except Exception:
-            pass
+
+        persisted = metaCache.get_cache().peek(path)
+        if persisted is not None and persisted["length"] is not None:
+            self._length_cache[path] = persisted["length"]
+            return float(persisted["length"])
+
+        self._awaiting_meta.add(path)   # the prefetcher will fill this in
         return 0.0
 
     # ------------------ Metadata caching ------------------
     def _get_meta_for_path(self, path: str) -> tuple[str, str]:
         """
         Return (artist, album) for a given path.
-        Uses in-memory cache, persisted userData['song_meta'] as a secondary store.
+        Uses in-memory cache, metaCache as a secondary store; never opens or
+        stats the file (the background tag scan validates the cache).
         """
         if not path:
             return ("", "")
@@ -1337,315 +1699,217 @@ class showLibrary(ctk.CTkFrame):
         except Exception:
             pass
 
-        # try persisted userData copy (in case cache not loaded properly earlier)
+        # try the persisted store (re-read in the background if the file changed since)
         try:
-            data = gud.getUserData()[0] # type: ignore
-            persisted = dict(data.get("song_meta", {}))
-            if path in persisted:
-                self._meta_cache[path] = persisted[path]
-                meta = persisted[path]
-                return (meta.get("artist", "") or "", meta.get("album", "") or "")
+            persisted = metaCache.get_cache().peek(path)
+            if persisted is not None:
+                meta = {"artist": persisted["artist"], "album": persisted["album"]}
+                self._meta_cache[path] = meta
+                return (meta["artist"], meta["album"])
         except Exception:
             pass
 
-        # fallback: read tags via mutagen (best-effort)
-        artist = ""
-        album = ""
-        try:
-            from mutagen import File as MutaFile # type: ignore
-            mf = MutaFile(path)
-            tags = getattr(mf, "tags", {}) or {}
-            # Common ID3/mp4/flac keys
-            if tags:
-                # ID3 v2: TPE1 (artist), TALB (album)
-                try:
-                    if "TPE1" in tags:
-                        a = tags.get("TPE1")
-                        artist = a[0] if isinstance(a, (list, tuple)) and a else str(a)
-                except Exception:
-                    pass
-                try:
-                    if "TALB" in tags:
-                        al = tags.get("TALB")
-                        album = al[0] if isinstance(al, (list, tuple)) and al else str(al)
-                except Exception:
-                    pass
-                # MP4 / common fields
-                try:
-                    if not artist and "artist" in tags:
-                        artist = tags.get("artist")
-                    if not album and "album" in tags:
-                        album = tags.get("album")
-                except Exception:
-                    pass
+        self._awaiting_meta.add(path)   # the prefetcher will fill this in
+        return ("", "")
 
-                # Some mutagen tag objects are lists or objects that string-format nicely
-                if isinstance(artist, (list, tuple)) and artist:
-                    artist = artist[0]
-                if isinstance(album, (list, tuple)) and album:
-                    album = album[0]
-        except Exception:
-            pass
+    def _on_table_scroll(self):
+        """Once scrolling settles, move rows still waiting for tags to the front of the queue."""
+        if self._scroll_after is not None:
+            self.after_cancel(self._scroll_after)
+        self._scroll_after = self.after(150, self._prioritise_visible)
 
-        artist = artist or ""
-        album = album or ""
+    def _prioritise_visible(self):
+        self._scroll_after = None
+        if not self._awaiting_meta or not hasattr(self.controller, "request_metadata"):
+            return
+        first, last = self.table.visible_range()
+        visible = [self.table_index[i]["path"] for i in range(first, last + 1) if i in self.table_index]
+        self.controller.request_metadata([p for p in visible if p in self._awaiting_meta], urgent=True)
 
-        # store in caches and persist
-        try:
-            self._meta_cache[path] = {"artist": artist, "album": album}
-            try:
-                data = gud.getUserData()[0] # type: ignore
-                data["song_meta"] = self._meta_cache
-                gud.addUserData(data)
-            except Exception:
-                # ignore persistence errors
-                pass
-        except Exception:
-            pass
+    def _cached_row(self, sid, meta):
+        """
+        The row model kept for a song, or None. Kept across rebuilds while the
+        song's name and path are unchanged and it is not waiting on tags that
+        have since arrived.
+        """
+        row = self._row_cache.get(sid)
+        if row is not None and row["title"] == meta.get("name", "Untitled") and row["path"] == meta.get("loc", ""):
+            if row["length"] != "--:--" or row["path"] in self._awaiting_meta:
+                return row
+        return None
 
-        return (artist, album) # type: ignore
+    def _build_row(self, sid, meta):
+        title = meta.get("name", "Untitled")
+        path = meta.get("loc", "")
+        artist, album = self._get_meta_for_path(path)
+        length_secs = self._get_length(path)
+        if path in self._awaiting_meta:
+            # placeholders until the prefetcher has read this file
+            artist = album = "…"
+            length_str = "--:--"
+        else:
+            artist = artist or "Unknown"
+            album = album or "Unknown"
+            length_str = f"{int(length_secs // 60):02}:{int(length_secs % 60):02}"
+        row = {"id": sid, "title": title, "artist": artist, "album": album, "length": length_str, "path": path}
+        self._row_cache[sid] = row
+        self._row_ids_by_path.setdefault(path, set()).add(sid)
+        return row
 
-    # double-buffered UI swap
-    def _swap_in_new_list_frame(self, ordered_ids, songs):
-        # create new offscreen frame
-        new_frame = ctk.CTkFrame(self.scroll_area, fg_color="transparent")
-        new_frame.grid_rowconfigure(0, weight=1)
-        new_frame.grid_columnconfigure(0, weight=1)
+    def _show_ordered_ids(self, ordered_ids, songs):
+        """
+        Show `ordered_ids`, applied to the table as a diff against what is on
+        screen: rows that stay keep their widgets, and only rows that appear or
+        whose texts changed are redrawn.
+
+        Rows without a cached model go in as title-only stubs and are built
+        progressively: the ones on screen straight away, the rest in
+        BUILD_SLICE_MS slices on the event loop. A newer call cancels an
+        unfinished build.
+        """
+        started = time.perf_counter()
+        self._cancel_build()
 
-        # Configure columns on the new frame (so labels align)
-        for col, w in enumerate(self.column_weights):
-            new_frame.grid_columnconfigure(col, weight=w)
+        rows, pending = [], []
+        for i, sid in enumerate(ordered_ids, start=1):
+            meta = songs.get(sid, {}) or {}
+            row = self._cached_row(sid, meta)
+            if row is None:
+                row = {"id": sid, "title": meta.get("name", "Untitled"), "artist": "", "album": "",
+                       "length": "", "path": meta.get("loc", "")}
+                pending.append((i, sid, meta))
+            rows.append(row)
+        diff = diff_ids(self._displayed_ids, ordered_ids)
+
+        def follow(index):
+            kept = diff.kept.get(index - 1) if index else None
+            return kept + 1 if kept is not None else None
+
+        self.selected_index = follow(self.selected_index)
+        self._playing_index = follow(getattr(self, "_playing_index", None))
+        self.table_index = {i: row for i, row in enumerate(rows, start=1)}
+        self._rows_by_path = {}
+        for i, row in self.table_index.items():
+            self._rows_by_path.setdefault(row["path"], []).append(i)
+        self._displayed_ids = list(ordered_ids)
+        self.last_diff = diff
+        self.table.apply_diff([self._row_texts(row) for row in rows], diff)
+
+        # the first screen is built now, everything else a slice at a time
+        first, last = self.table.visible_range()
+        on_screen = [p for p in pending if first <= p[0] <= last]
+        self._build_pending = [p for p in pending if not first <= p[0] <= last]
+        self._build_pending.reverse()   # popped from the end
+        self.build_stats = {"rows": len(rows), "built": 0, "slices": 0, "started": started, "total_ms": None}
+        self._build_rows(on_screen)
+        self._build_token += 1
+        self._continue_build(self._build_token, songs)
+
+    def _build_rows(self, pending):
+        for i, sid, meta in pending:
+            row = self._build_row(sid, meta)
+            self.table_index[i] = row
+            self.table.update_row(i, self._row_texts(row))
+        self.build_stats["built"] += len(pending)
+
+    def _continue_build(self, token, songs):
+        self._build_after = None
+        if token != self._build_token:
+            return
+        deadline = time.perf_counter() + self.BUILD_SLICE_MS / 1000.0
+        while self._build_pending and time.perf_counter() < deadline:
+            self._build_rows((self._build_pending.pop(),))
+        self.build_stats["slices"] += 1
 
-        # if no songs to show, put placeholder then swap quickly
-        if not ordered_ids:
-            placeholder = ctk.CTkLabel(new_frame, text="No songs in library.", font=("Helvetica", 16))
-            placeholder.grid(row=0, column=0, columnspan=len(self.column_weights), sticky="n", padx=8, pady=22)
-            # swap frames
+        if self._build_pending:
+            self._build_after = self.after(1, self._continue_build, token, songs)
+            return
+        stats = self.build_stats
+        stats["total_ms"] = (time.perf_counter() - stats.pop("started")) * 1000.0
+        l.debug("Library rows built in %.1f ms (%d rows, %d built, %d slices)",
+                stats["total_ms"], stats["rows"], stats["built"], stats["slices"])
+        self._request_missing_metadata(self._displayed_ids, songs)
+
+    def _cancel_build(self):
+        if self._build_after is not None:
             try:
-                self.list_container.grid_forget()
-                self.list_container.destroy()
+                self.after_cancel(self._build_after)
             except Exception:
                 pass
-            self.list_container = new_frame
-            self.list_container.grid(row=0, column=0, sticky="nsew")
-            # reset bookkeeping
-            self.row_bg_frames.clear()
-            self.row_widgets.clear()
-            self.table_index.clear()
-            self.selected_index = None
+            self._build_after = None
+        self._build_token += 1
+        self._build_pending = []
+
+    def destroy(self):
+        self._cancel_build()
+        if self._scroll_after is not None:
+            self.after_cancel(self._scroll_after)
+        super().destroy()
+
+    # row events (the table reports 1-based row numbers)
+    def _on_row_click(self, idx, event=None):
+        row = self.table_index.get(idx)
+        if row is None:
             return
+        p, t = row["path"], row["title"]
+        target = CURRENTLY_PLAYING if CURRENTLY_PLAYING else p
+        try:
+            self._select_row(idx)
+            self.controller.play_song(path=target, name=t)
+        except Exception:
+            pass
 
-        # Build rows into new_frame
-        row_font = ("Helvetica", 16)
+        if PIL_AVAILABLE:
+            self.controller.show_album_art("library", target, self.albumArtSize, self.albumArtLabel)
 
-        new_row_bg_frames = []
-        new_row_widgets = []
-        new_table_index = {}
+            self.songTitleLabel.configure(text=f"{t}")
+            self.songInfoLabel.configure(text="")
+            # details are read off the Tk thread, only for the row that was clicked
+            self._details_path = target
+            self.controller.request_song_record(target, self._show_song_details)
 
-        for i, sid in enumerate(ordered_ids, start=1):
-            meta = songs.get(sid, {}) or {}
-            title = meta.get("name", "Untitled")
-            path = meta.get("loc", "")
-            artist, album = self._get_meta_for_path(path)
-            artist = artist or "Unknown"
-            album = album or "Unknown"
-            length_secs = self._get_length(path)
-            length_str = f"{int(length_secs // 60):02}:{int(length_secs % 60):02}"
+    def _show_song_details(self, songData):
+        if songData.path != getattr(self, "_details_path", None):
+            return      # another row was clicked meanwhile
+        self.songInfoLabel.configure(
+            text=f"\n{songData.artist or 'Unknown'}\n{songData.album or 'Unknown'}\n{songData.year or 'Unknown'}"
+        )
 
-            bg = ctk.CTkFrame(new_frame, fg_color=self.ROW_BG, corner_radius=6, height=self.ROW_HEIGHT)
-            bg.grid(row=i-1, column=0, columnspan=len(self.column_weights), sticky="ew", padx=0, pady=(1,1))
-            new_frame.grid_rowconfigure(i-1, minsize=self.ROW_HEIGHT)
-
-            label_padx = (8,6)
-            idx_lbl = ctk.CTkLabel(new_frame, text=str(i), font=row_font, fg_color=self.ROW_BG, corner_radius=0)
-            idx_lbl.grid(row=i-1, column=0, sticky="w", padx=label_padx, pady=0)
-
-            title_lbl = ctk.CTkLabel(new_frame, text=title, font=row_font, fg_color=self.ROW_BG, corner_radius=0)
-            title_lbl.grid(row=i-1, column=1, sticky="w", padx=label_padx, pady=0)
-
-            artist_lbl = ctk.CTkLabel(new_frame, text=artist, font=row_font, fg_color=self.ROW_BG, corner_radius=0)
-            artist_lbl.grid(row=i-1, column=2, sticky="w", padx=label_padx, pady=0)
-
-            album_lbl = ctk.CTkLabel(new_frame, text=album, font=row_font, fg_color=self.ROW_BG, corner_radius=0)
-            album_lbl.grid(row=i-1, column=3, sticky="w", padx=label_padx, pady=0)
-
-            length_lbl = ctk.CTkLabel(new_frame, text=length_str, font=row_font, fg_color=self.ROW_BG, corner_radius=0)
-            length_lbl.grid(row=i-1, column=4, sticky="w", padx=label_padx, pady=0)
-
-            # bind click -> play
-            def _make_on_click(p=path, t=title, idx=i):
-                audioData = getAudioData(CURRENTLY_PLAYING if CURRENTLY_PLAYING else p)
-
-                def _on_click(event=None):
-                    try:
-                        self._select_row(idx)
-                        self.controller.play_song(path=CURRENTLY_PLAYING if CURRENTLY_PLAYING else p, name=t)
-                    except Exception:
-                        pass
-
-                    if PIL_AVAILABLE:
-                        try:
-                            albumArt = load_album_art(CURRENTLY_PLAYING if CURRENTLY_PLAYING else p, size=self.albumArtSize)
-
-                            if albumArt:
-                                self.albumArtLabel.configure(image=albumArt, text='')
-
-                            else:
-                                # if CTkImage couldn't be created, keep text placeholder
-                                self.albumArtLabel.configure(image=None, text="♪")
-
-                        except Exception as e:
-                            l.debug("Album art load error: %s", e)
-                            try:
-                                self.albumArtLabel.configure(image=None, text="♪")
-                            except Exception as e:
-                                l.error(e)
-
-                        songData = audioData
-                        self.songTitleLabel.configure(text=f"{t}")
-                        self.songInfoLabel.configure(
-                            text=f"\n{songData.artist or 'Unknown'}\n{songData.album or 'Unknown'}\n{songData.year or 'Unknown'}"
-                        )
-
-                        # api_token = rq.request('get', f'https://ws.audioscrobbler.com/2.0/?method=auth.gettoken&api_key={API_KEY}&format=json').json()['token']
-                        if API_KEY is not None:
-                            artistRequest = rq.request('get', f'http://ws.audioscrobbler.com/2.0/?method=artist.getinfo&artist={songData.artist}&api_key={API_KEY}&format=json').json()
-                            print(artistRequest)
-                        
-                            self.artistBio.configure(text=f"{''.join(artistRequest['artist']['bio']['content'].split('href=')[0]).replace('<a', '')}")
-
-                    
-                return _on_click
-
-            bg.bind("<Button-1>", _make_on_click())
-            for w in (idx_lbl, title_lbl, artist_lbl, album_lbl, length_lbl):
-                w.bind("<Button-1>", _make_on_click())
-
-            # context menu (right-click)
-            def _make_on_rclick(sid=sid, name=title):
-                def _on_rclick(event):
-                    if hasattr(self.controller, "show_context_menu"):
-                        try:
-                            self.controller.show_context_menu(event, {"sid": sid, "name": name})
-                        except Exception:
-                            pass
-                return _on_rclick
-
-            bg.bind("<Button-3>", _make_on_rclick())
-            for w in (idx_lbl, title_lbl, artist_lbl, album_lbl, length_lbl):
-                w.bind("<Button-3>", _make_on_rclick())
-
-            # hover highlights
-            def _make_on_enter(frame_bg=bg, widgets=(idx_lbl, title_lbl, artist_lbl, album_lbl, length_lbl)):
-                def _on_enter(e):
-                    try:
-                        frame_bg.configure(fg_color=self.ROW_HOVER_BG)
-                        for w in widgets:
-                            w.configure(fg_color=self.ROW_HOVER_BG)
-                    except Exception:
-                        pass
-                return _on_enter
-
-            def _make_on_leave(frame_bg=bg, widgets=(idx_lbl, title_lbl, artist_lbl, album_lbl, length_lbl)):
-                def _on_leave(e):
-                    try:
-                        frame_bg.configure(fg_color=self.ROW_BG)
-                        for w in widgets:
-                            w.configure(fg_color=self.ROW_BG)
-                    except Exception:
-                        pass
-                return _on_leave
-
-            bg.bind("<Enter>", _make_on_enter())
-            bg.bind("<Leave>", _make_on_leave())
-            for w in (idx_lbl, title_lbl, artist_lbl, album_lbl, length_lbl):
-                w.bind("<Enter>", _make_on_enter())
-                w.bind("<Leave>", _make_on_leave())
-
-            # collect refs locally
-            new_row_bg_frames.append(bg)
-            new_row_widgets.append({"idx": idx_lbl, "title": title_lbl, "artist": artist_lbl, "album": album_lbl, "length": length_lbl})
-            new_table_index[i] = {"id": sid, "title": title, "artist": artist, "album": album, "length": length_str, "path": path}
-
-        # finished building new_frame -> swap it in
-        try:
-            try:
-                self.list_container.grid_forget()
-                self.list_container.destroy()
-            except Exception:
-                pass
-            self.list_container = new_frame
-            self.list_container.grid(row=0, column=0, sticky="nsew")
-        except Exception:
+        # api_token = rq.request('get', f'https://ws.audioscrobbler.com/2.0/?method=auth.gettoken&api_key={API_KEY}&format=json').json()['token']
+        if API_KEY is not None:
+            artistRequest = rq.request('get', f'http://ws.audioscrobbler.com/2.0/?method=artist.getinfo&artist={songData.artist}&api_key={API_KEY}&format=json').json()
+            print(artistRequest)
+
+            self.artistBio.configure(text=f"{''.join(artistRequest['artist']['bio']['content'].split('href=')[0]).replace('<a', '')}")
+
+    def _on_row_rclick(self, idx, event):
+        row = self.table_index.get(idx)
+        if row is not None and hasattr(self.controller, "show_context_menu"):
             try:
-                for child in self.list_container.winfo_children():
-                    child.destroy()
+                self.controller.show_context_menu(event, {"sid": row["id"], "name": row["title"]})
             except Exception:
                 pass
-            self.list_container = new_frame
-            self.list_container.grid(row=0, column=0, sticky="nsew")
-
-        # update bookkeeping references to the currently visible lists
-        self.row_bg_frames = new_row_bg_frames
-        self.row_widgets = new_row_widgets
-        self.table_index = new_table_index
-        self.selected_index = None
 
     # selection & playing helpers
     def set_playing_row(self, index):
         try:
-            if hasattr(self, "_playing_index") and self._playing_index is not None:
-                prev_bg = self.row_bg_frames[self._playing_index - 1]
-                prev_bg.configure(fg_color=self.ROW_BG)
-                prev_widgets = self.row_widgets[self._playing_index - 1]
-                for key in ("idx", "title", "artist", "album", "length"):
-                    prev_widgets[key].configure(fg_color=self.ROW_BG)
-        except Exception:
-            pass
-
-        try:
-            if 1 <= index <= len(self.row_bg_frames):
-                bg = self.row_bg_frames[index - 1]
-                bg.configure(fg_color=self.ROW_ACTIVE_BG)
-                widgets = self.row_widgets[index - 1]
-                for key in ("idx", "title", "artist", "album", "length"):
-                    widgets[key].configure(fg_color=self.ROW_ACTIVE_BG)
+            self.table.set_highlight("playing", index)
+            if 1 <= index <= len(self.table_index):
                 self._playing_index = index
         except Exception:
             pass
 
     def _select_row(self, index):
         try:
-            if self.selected_index is not None and 1 <= self.selected_index <= len(self.row_bg_frames):
-                prev_bg = self.row_bg_frames[self.selected_index - 1]
-                prev_bg.configure(fg_color=self.ROW_BG)
-                prev_widgets = self.row_widgets[self.selected_index - 1]
-                for key in ("idx", "title", "artist", "album", "length"):
-                    try:
-                        prev_widgets[key].configure(fg_color=self.ROW_BG)
-                    except Exception:
-                        pass
-        except Exception:
-            pass
-
-        try:
-            if 1 <= index <= len(self.row_bg_frames):
-                bg = self.row_bg_frames[index - 1]
-                bg.configure(fg_color=self.ROW_ACTIVE_BG)
-                widgets = self.row_widgets[index - 1]
-                for key in ("idx", "title", "artist", "album", "length"):
-                    try:
-                        widgets[key].configure(fg_color=self.ROW_ACTIVE_BG)
-                    except Exception:
-                        pass
+            self.table.set_highlight("selected", index)
+            if 1 <= index <= len(self.table_index):
                 self.selected_index = index
         except Exception:
             pass
 
 
-
 class showPlaylist(TickingFrame):
-    playlist_icon_size = (256, 256)
+    playlist_icon_size = (artCache.ICON_SIZES["header"],) * 2
 
     def __init__(self, parent, controller, playlist_id, playlist_data, songs_data):
         super().__init__(parent, fg_color='transparent')
@@ -1673,57 +1937,18 @@ class showPlaylist(TickingFrame):
         header_container.grid_columnconfigure(1, weight=1)  # title column
         header_container.grid_columnconfigure(2, weight=1)  # info column
 
+        # the header variant is stored pre-scaled; no resampling when a playlist opens
         self._playlist_icon_ctkimage = None
-        icon_path = None
-        try:
-            icon_path = self.playlist_data.get("icon")
-        except Exception:
-            icon_path = None
-
-        if icon_path and PIL_AVAILABLE:
+        if PIL_AVAILABLE:
             try:
-                from PIL import Image, ImageOps # type: ignore
-                
-                try:
-                    from customtkinter import CTkImage # type: ignore
-                except Exception:
-                    CTkImage = None
-
-                p = Path(icon_path)
-                if p.exists() and CTkImage is not None:
-                    try:
-                        resample = Image.Resampling.LANCZOS
-                    except Exception:
-                        resample = getattr(Image, "LANCZOS", Image.ANTIALIAS) # type: ignore
-
-                    img = Image.open(str(p)).convert("RGBA")
-
-                    try:
-                        contained = ImageOps.contain(img, self.playlist_icon_size, method=resample)
-
-                    except TypeError:
-                        contained = ImageOps.contain(img, self.playlist_icon_size)
-
-                    thumb = Image.new("RGBA", self.playlist_icon_size, (0, 0, 0, 0))
-                    x = (self.playlist_icon_size[0] - contained.width) // 2
-                    y = (self.playlist_icon_size[1] - contained.height) // 2
-                    thumb.paste(contained, (x, y), contained)
-
-                    self._playlist_icon_ctkimage = CTkImage(light_image=thumb, dark_image=thumb, size=self.playlist_icon_size)
-
-            except Exception:
+                icon = artCache.playlist_icon(self.playlist_data, "header")
+                if icon is not None:
+                    self._playlist_icon_ctkimage = ctk.CTkImage(light_image=icon, dark_image=icon, size=self.playlist_icon_size)
+            except Exception as e:
+                l.error("Failed to load playlist icon: %s", e)
                 self._playlist_icon_ctkimage = None
 
         if self._playlist_icon_ctkimage:
-            icon_lbl = ctk.CTkLabel(header_container, image=self._playlist_icon_ctkimage, text="")
-            icon_lbl.grid(row=1, column=0, sticky="nw", padx=(0, 12))
-
-        else:
-            spacer = ctk.CTkFrame(header_container, width=128, height=128, fg_color="transparent")
-            spacer.grid(row=0, column=0, sticky="nw", padx=(0, 12))
-
-
-        if getattr(self, "_playlist_icon_ctkimage", None):
             icon_lbl = ctk.CTkLabel(header_container, image=self._playlist_icon_ctkimage, text="")
             icon_lbl.grid(row=1, column=0, rowspan=2, sticky="nw", padx=(0, 16))
 
@@ -1754,7 +1979,7 @@ class showPlaylist(TickingFrame):
 
         self.duration_label.pack(anchor="w", pady=(4, 0))
 
-        self._embedded_lib = showLibrary(parent=self, controller=self.controller)
+        self._embedded_lib = showLibrary(parent=self, controller=self.controller, song_source=self._build_filtered_songs)
         self._embedded_lib.configure(fg_color="transparent")
 
         try:
@@ -1810,12 +2035,6 @@ class showPlaylist(TickingFrame):
         self._embedded_lib.grid_rowconfigure(0, weight=1)
         self._embedded_lib.grid_columnconfigure(0, weight=1)
 
-        try:
-            for col, w in enumerate(self.column_weights):
-                self._embedded_lib.list_container.grid_columnconfigure(col, weight=w)
-        except Exception:
-            pass
-        
         self.rightSideWindow = self._embedded_lib.rightSideWindow
         self.rightSideWindow.grid_forget()
 
@@ -1833,30 +2052,28 @@ class showPlaylist(TickingFrame):
         """
         Return (hours, minutes) total duration for the given playlist.
         """
+        # untagged songs are queued by the embedded list; they count once read
+        # (on_metadata_ready refreshes the label)
+        locs = []
+        for sid in self.playlist_data.get("songs", []):
+            song = self.songs_data.get(sid)
+            if song and song.get("loc"):
+                locs.append(song["loc"])
 
-        from mutagen import _file as MutaFile # type: ignore
-
-        playlist_data = self.playlist_data
-        all_songs = self.songs_data
-
-        total_seconds = 0
-
-        for sid in playlist_data.get("songs", []):
-            song = all_songs.get(sid)
-            length = MutaFile.File(song.get('loc', None)).info.length # type: ignore
-
-            if not song:
-                continue
-
-            if not length:
-                continue
-
-            total_seconds += int(length)
+        total_seconds = int(metaCache.get_cache().duration_of(locs))
 
         hours = total_seconds // 3600
         minutes = (total_seconds % 3600) // 60
         return hours, minutes
 
+    def _refresh_duration_label(self):
+        try:
+            num_songs = len(self.playlist_data.get("songs", []))
+            hours, minutes = self.get_playlist_duration()
+            self.duration_label.configure(text=f"{num_songs} Songs • {hours}hrs {minutes}mins")
+        except Exception as e:
+            l.error("Failed to update playlist duration: %s", e)
+
 
     def _collect_playlist_song_ids(self):
         """Return list of song ids contained in playlist_data (order preserved if 'songs' exists)."""
@@ -1891,28 +2108,26 @@ class showPlaylist(TickingFrame):
         return filtered
 
     def _populate_embedded_with_playlist(self):
-        """Ask the embedded showLibrary to build rows for this playlist's songs."""
-        filtered = self._build_filtered_songs()
+        """Have the embedded showLibrary's track table list this playlist's songs."""
         try:
-            self._embedded_lib._build_rows_filtered_and_sorted(filtered)
-        except Exception:
-            try:
-                for child in list(self._embedded_lib.list_container.winfo_children()):
-                    child.destroy()
-            except Exception:
-                pass
-            row = 0
-            for sid, meta in filtered.items():
-                name = meta.get("name", "Untitled")
-                path = meta.get("loc", "")
-                btn = ctk.CTkButton(self._embedded_lib.list_container, text=name,
-                                    command=lambda p=path, n=name: self.controller.play_song(p, n))
-                btn.grid(row=row, column=0, sticky="ew", padx=8, pady=2)
-                row += 1
+            self._embedded_lib._try_build_from_userdata(force=True)
+        except Exception as e:
+            l.error("Failed to list playlist songs: %s", e)
 
     def refresh(self):
         self._populate_embedded_with_playlist()
 
+    def on_tag_scan_progress(self, done, total):
+        self._embedded_lib.on_tag_scan_progress(done, total)
+
+    def on_metadata_ready(self, paths):
+        self._embedded_lib.on_metadata_ready(paths)
+        self._refresh_duration_label()
+
+    def on_tag_scan_done(self):
+        self._embedded_lib.on_tag_scan_done()
+        self._refresh_duration_label()
+
     def play_song(self, path, name):
         try:
             self.controller.play_song(path, name)
@@ -2011,9 +2226,19 @@ class Main(TickingFrame):
 
 class App(ctk.CTk):
     """Controller class for PyTunes"""
+    TK_POLL_BUSY_MS = 20        # hand-off poll while worker threads are sending calls
+    TK_POLL_IDLE_MS = 500       # ...backing off to this once they go quiet
+    REVALIDATE_EVERY = 5        # heartbeats between checks for user data edited elsewhere
+
     def __init__(self, *args, **kwargs):
         ctk.CTk.__init__(self, *args, **kwargs)
 
+        # calls from worker threads wait here for the Tk thread (see call_on_tk)
+        self._tk_calls = queue.Queue()
+        self._tk_poll_ms = self.TK_POLL_IDLE_MS
+        self.after(self._tk_poll_ms, self._drain_tk_calls)
+        self._heartbeats = 0
+
         self.w = int(self.winfo_screenwidth() * 0.8)
         self.h = int(self.winfo_screenheight() * 0.6)
 
@@ -2075,47 +2300,13 @@ class App(ctk.CTk):
                 self.volume_level = 100
 
 
-        songs = user.get('songs', {}) #type: ignore
-
-
-        self.paths = [str(p.resolve()) for p in Path('Music').rglob('*') if p.is_file()]
-        self.toAdd = []
-
-        dataCopy = user #type: ignore
-
-        if (len(songs.keys()) != len(self.paths)) and data:
-            lg.debug(f"({len(songs.keys())=} != {len(self.paths)=}). Updating user.json...")
-
-            if len(self.paths) < len(songs.keys()):
-                l.error(f"({len(songs.keys())=} > {len(self.paths)=}. Songs may not show up since user.json contains the data, but the song file isn't in CWD/Music")
-                ...
-
-            else:
-                for p in self.paths:
-                    self.toAdd.append(p)
-
-
-                songsVals = list(os.path.basename(i['loc']) for i in songs.values())
-
-                for s in songsVals:
-                    if s not in self.paths:
-                        self.toAdd.append(s)
-
-            l.info(f'Music folder out of sync with user.json. Adding{self.toAdd=}')
-
-            for c, p in enumerate(self.toAdd):
-                name_part = os.path.splitext(os.path.basename(p))[0]
-                dataCopy['songs'][f'song{c}'] = {
-                        'name': name_part,
-                        'loc': os.path.abspath(p)
-                    }
-
-            try:
-                gud.addUserData(dataCopy)
-
-
-            except Exception as e:
-                l.error(e)
+        # bring user data in line with the Music folder; only changed files are touched
+        try:
+            result = libraryScanner.sync_library()
+            if result:
+                l.info(f"Music folder out of sync with user data. Applied {result}")
+        except Exception as e:
+            l.error(e)
 
 
         self.initSideWindow = createSideWindow(
@@ -2230,6 +2421,13 @@ class App(ctk.CTk):
         progress_container.grid_columnconfigure(1, weight=0)
 
 
+        # waveform of the current track, drawn behind the (thin) progress bar
+        self._waveform_peaks = None
+        self.waveform_canvas = ctk.CTkCanvas(progress_container, height=32, bg="#222222", highlightthickness=0, bd=0)
+        self.waveform_canvas.grid(row=0, column=0, sticky="ew", padx=(0,6))
+        self.waveform_canvas.bind("<Configure>", lambda e: self._draw_waveform())
+        self.waveform_canvas.bind("<Button-1>", self._on_seek)
+
         self.progress = ctk.CTkProgressBar(progress_container, height=8)
         self.progress.grid(row=0, column=0, sticky="ew", padx=(0,6))
         self.progress.set(0)
@@ -2259,6 +2457,33 @@ class App(ctk.CTk):
         self.volume_slider.grid(row=0, column=0, columnspan=4, sticky="s", padx=20, pady=10)
         self.audio.set_volume(self.volume_level/100)
 
+        # read tags for songs that have none cached yet on the tag pool, off the Tk thread;
+        # views push the rows they are showing to the front of the queue
+        self.tag_pool = tagPool.TagExtractionPool()
+        self.prefetcher = tagPool.MetadataPrefetcher(
+            self.tag_pool,
+            on_batch=lambda paths: self.call_on_tk(self._notify_frames, "on_metadata_ready", paths),
+            on_progress=lambda done, total: self.call_on_tk(self._notify_frames, "on_tag_scan_progress", done, total),
+            on_idle=lambda: self.call_on_tk(self._on_tag_scan_done)
+        )
+        self._start_tag_scan()
+
+        # measure track loudness in the background so playback can even out volume
+        self.loudness = loudness.LoudnessAnalyser(loudness.get_cache())
+        self.loudness.request(self._library_paths())
+
+        # album art is decoded and scaled off the Tk thread; only the CTkImage is built here
+        self.art_loader = artCache.ArtLoader(album_art_cache(), self.call_on_tk) if PIL_AVAILABLE else None
+
+        # tags for the playing/selected song are parsed off the Tk thread too
+        self._record_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="song-record")
+
+        # pick up songs copied into / removed from the Music folder while running
+        self.folder_watcher = folderWatcher.FolderWatcher(
+            on_change=lambda result: self.call_on_tk(self._on_music_folder_changed, result)
+        )
+        self.folder_watcher.start()
+
         self.frames = {}
         self.current_frame = None
 
@@ -2303,6 +2528,29 @@ class App(ctk.CTk):
         self._menu.add_command(label="Quit", command=self.destroy)
         
 
+    def destroy(self):
+        try:
+            self.folder_watcher.stop()
+            self.prefetcher.close()
+            self.tag_pool.close()
+            self.loudness.close()
+            waveform.get_cache().close()
+            if self.art_loader is not None:
+                self.art_loader.close()
+            self._record_executor.shutdown(wait=False, cancel_futures=True)
+        except Exception:
+            pass
+
+        # make sure write-behind user data reaches disk before the window goes away
+        try:
+            metaCache.get_cache().flush()
+            gud.flush()
+        except Exception as e:
+            l.error("Failed to flush user data on close: %s", e)
+
+        super().destroy()
+
+
     def save_settings(self):
             gud.addUserData({"settings": {
                 "shuffle": self.shuffle_state,
@@ -2446,11 +2694,13 @@ class App(ctk.CTk):
             # reset & start
             self.audio.stop()
             self.audio.load(path)
+            self.audio.set_gain_db(loudness.get_cache().gain_db(path))
             self.audio.play()
             self.play_start_offset = 0.0
             self.current_song_name = name
             self.current_song_path = path
             self.progress.set(0)
+            self._show_waveform(path)
 
             CURRENTLY_PLAYING = self.current_song_path
 
@@ -2467,43 +2717,27 @@ class App(ctk.CTk):
                 except Exception as e:
                     print("Highlight failed:", e)
 
-            if PIL_AVAILABLE:
-                try:
-                    new_img = load_album_art(path, size=self._album_art_size)
-                    if new_img:
-                        self._album_art_img = new_img
-                        self.album_art_label.configure(image=self._album_art_img, text="")
-                    else:
-                        # if CTkImage couldn't be created, keep text placeholder
-                        self.album_art_label.configure(image=None, text="♪")
-                except Exception as e:
-                    l.debug("Album art load error: %s", e)
-                    try:
-                        self.album_art_label.configure(image=None, text="♪")
-                    except Exception as e:
-                        l.error(e)
-                        
-            else:
-                try:
-                    self.album_art_label.configure(image=None, text="♪")
-                except Exception as e:
-                    l.error(e)
+            def _set_art(image):
+                self._album_art_img = image
+                self.album_art_label.configure(image=image, text="")
 
+            self.show_album_art("now_playing", path, self._album_art_size, self.album_art_label, _set_art)
 
-            # tags / labels
-            songData = getAudioData(path)
+            # tags / labels / duration: the cached length is good enough until the file is parsed
             self.now_playing_label.configure(text=f"{name}")
-            self.song_info_label.configure(
-                text=f"\n{songData.artist or 'Unknown'} • {songData.album or 'Unknown'} • {songData.year or 'Unknown'}"
-            )
+            self.song_info_label.configure(text="")
+            persisted = metaCache.get_cache().peek(path)
+            self.current_song_length = (persisted["length"] if persisted else 0.0) or 0.0
 
-            # duration
-            try:
-                from mutagen import _file as MutaFile # type: ignore
-                audio_file = MutaFile.File(path)
-                self.current_song_length = float(audio_file.info.length) if audio_file and audio_file.info else 0.0
-            except Exception:
-                self.current_song_length = 0.0
+            def _set_info(songData):
+                if path != self.current_song_path:
+                    return
+                self.song_info_label.configure(
+                    text=f"\n{songData.artist or 'Unknown'} • {songData.album or 'Unknown'} • {songData.year or 'Unknown'}"
+                )
+                self.current_song_length = songData.duration
+
+            self.request_song_record(path, _set_info)
 
         except Exception as e:
             l.critical(f"Error playing {name}: {e}")
@@ -2512,12 +2746,72 @@ class App(ctk.CTk):
     def stop_song(self):
         self.audio.stop()
         self.progress.set(0)
+        self._waveform_peaks = None
+        self._draw_waveform()
         self.time_label.configure(text="00:00 / 00:00")
         self.now_playing_label.configure(text="")
         self.song_info_label.configure(text="")
         self.album_art_label.configure(image=self._album_art_img)  # or load_album_art("") to reset
 
 
+    def show_album_art(self, target, path, size, label, on_image=None):
+        """
+        Show the art for `path` on `label` without blocking: a placeholder now,
+        the real cover once the art worker has it. Each `target` only ever
+        shows its latest request.
+        """
+        def apply(image):
+            try:
+                if on_image is not None:
+                    on_image(image)
+                else:
+                    label.configure(image=image, text="")
+            except Exception as e:
+                l.error("Album art display failed: %s", e)
+
+        if self.art_loader is None:
+            try:
+                label.configure(image=None, text="♪")
+            except Exception as e:
+                l.error(e)
+            return
+        try:
+            self.art_loader.request(target, path, size, apply, placeholder=True)
+        except Exception as e:
+            l.debug("Album art load error: %s", e)
+
+
+    def _show_waveform(self, path):
+        """Draw cached peaks for `path`, or clear and let the background decode fill them in."""
+        self._waveform_peaks = None
+        self._draw_waveform()
+
+        def ready(p, peaks):
+            self.call_on_tk(self._on_waveform_ready, p, peaks)
+
+        try:
+            waveform.get_cache().request(path, ready)
+        except Exception as e:
+            l.error("Waveform request failed: %s", e)
+
+    def _on_waveform_ready(self, path, peaks):
+        if path == self.current_song_path:
+            self._waveform_peaks = peaks
+            self._draw_waveform()
+
+    def _draw_waveform(self):
+        canvas = self.waveform_canvas
+        canvas.delete("all")
+        width, height = canvas.winfo_width(), canvas.winfo_height()
+        if not self._waveform_peaks or width <= 1:
+            return
+
+        mid = height / 2
+        cols = waveform.columns(self._waveform_peaks, width)
+        top = [(x, mid - high * mid) for x, (_low, high) in enumerate(cols)]
+        bottom = [(x, mid - low * mid) for x, (low, _high) in reversed(list(enumerate(cols)))]
+        canvas.create_polygon(*(c for point in top + bottom for c in point), fill="#4a4a4a", outline="")
+
     def _on_seek(self, event):
         # guard
         p = self.current_song_path
@@ -2594,10 +2888,6 @@ class App(ctk.CTk):
             # Route to your home page
             self.show_frame(Main)   # or showLibrary / showPlaylist
 
-            # Kick the heartbeat once immediately so UI updates without waiting 100ms
-            if hasattr(self, "_heartbeat"):
-                self.after(0, self._heartbeat)
-
             # Also broadcast a virtual event for any widget that wants to bind directly
             self.event_generate("<<UserDataChanged>>", when="tail")
 
@@ -2606,6 +2896,7 @@ class App(ctk.CTk):
 
 
     def _heartbeat(self):
+        """Drives time-based UI only; data changes arrive through watch_user_data."""
         try:
             if getattr(self, "initSideWindow", None):
                 tick = getattr(self.initSideWindow, "refresh_tick", None)
@@ -2614,15 +2905,127 @@ class App(ctk.CTk):
         except Exception:
             pass
 
+        # cheap stat check so edits made by another process still get published
+        self._heartbeats += 1
+        if self._heartbeats % self.REVALIDATE_EVERY == 0:
+            gud.revalidate()
+
+        self.after(1000, self._heartbeat)
+
+
+    def _start_tag_scan(self):
+        """Validate the tag cache against the files off the Tk thread and queue reads for what is missing or stale."""
+        def scan():
+            paths = tagPool.paths_missing_metadata()
+            if paths:
+                l.info(f"Reading tags for {len(paths)} files in the background")
+                self.request_metadata(paths)
+
+        threading.Thread(target=scan, name="tag-scan", daemon=True).start()
+
+    def request_metadata(self, paths, urgent=False):
+        """Queue tag reads for `paths`; urgent ones (rows on screen) go first."""
         try:
-            page = getattr(self, "current_page", None)
-            tick = getattr(page, "refresh_tick", None)
-            if callable(tick):
-                tick()
-        except Exception:
-            pass
+            self.prefetcher.request(paths, urgent=urgent)
+        except Exception as e:
+            l.error("Failed to queue tag reads: %s", e)
+
+    def _on_music_folder_changed(self, result):
+        l.info(f"Music folder changed: {result}")
+        if result.added or result.modified:
+            self.request_metadata(result.added + result.modified)
+            self.loudness.request(result.added + result.modified)
+
+    def _library_paths(self):
+        data = gud.getUserDataView()
+        songs = (data[0].get("songs", {}) or {}) if data else {}
+        return [(meta or {}).get("loc", "") for meta in songs.values()]
+
+    def _notify_frames(self, hook_name, *args):
+        for frame in list(getattr(self, "frames", {}).values()):
+            hook = getattr(frame, hook_name, None)
+            if callable(hook):
+                try:
+                    hook(*args)
+                except Exception as e:
+                    l.error("%s failed: %s", hook_name, e)
 
-        self.after(100, self._heartbeat)
+    def _on_tag_scan_done(self):
+        l.info(f"Tag reads finished; {metaCache.get_cache().stats()}")
+        self._notify_frames("on_tag_scan_done")
+
+
+    def request_song_record(self, path, on_record):
+        """
+        Parse `path` on a worker thread and call `on_record(record)` on the Tk thread.
+        A parse already running for the art loader is shared (songRecord.RecordCache).
+        """
+        def work():
+            try:
+                record = getAudioData(path)
+            except Exception as e:
+                l.error("Reading tags for %s failed: %s", path, e)
+                return
+            self.call_on_tk(on_record, record)
+
+        try:
+            self._record_executor.submit(work)
+        except RuntimeError as e:   # shutting down
+            l.debug("Tag read not queued: %s", e)
+
+    def call_on_tk(self, fn, *args):
+        """Run `fn(*args)` on the Tk thread. Safe from any thread, even before mainloop starts."""
+        self._tk_calls.put((fn, args))
+
+    def _drain_tk_calls(self):
+        """Run the calls handed over by call_on_tk; polls quickly while busy, backs off when idle."""
+        ran = False
+        while True:
+            try:
+                fn, args = self._tk_calls.get_nowait()
+            except queue.Empty:
+                break
+            ran = True
+            try:
+                fn(*args)
+            except Exception as e:
+                l.error("Call from worker thread failed: %s", e)
+        if ran:
+            self._tk_poll_ms = self.TK_POLL_BUSY_MS
+        else:
+            self._tk_poll_ms = min(self._tk_poll_ms * 2, self.TK_POLL_IDLE_MS)
+        self.after(self._tk_poll_ms, self._drain_tk_calls)
+
+    def watch_user_data(self, widget, callback, keys=None):
+        """
+        Call `callback(changed_keys)` on the Tk thread whenever the given user data
+        keys change, until `widget` is destroyed. Bursts of changes made before the
+        Tk thread gets to them are delivered as a single call.
+        """
+        pending = set()
+        pending_lock = threading.Lock()
+
+        def deliver():
+            with pending_lock:
+                changed = frozenset(pending)
+                pending.clear()
+            try:
+                if changed and widget.winfo_exists():
+                    callback(changed)
+            except Exception as e:
+                l.error("User data change handler failed: %s", e)
+
+        def on_change(changed):
+            # runs on whichever thread made the change: no Tk calls here
+            with pending_lock:
+                first = not pending
+                pending.update(changed)
+            if first:
+                self.call_on_tk(deliver)
+
+        unsubscribe = gud.subscribe(on_change, keys)
+        widget.bind("<Destroy>", lambda e: unsubscribe() if e.widget is widget else None, add="+")
+        return unsubscribe
 
 
     def _update_volume(self, v):
@@ -0,0 +1,448 @@
+"""
+SQLite-backed alternative to user.json.
+
+Exposes the same interface as getUserData.UserDataStore (view/load/replace/merge)
+so it can sit behind getUserData()/setUserData()/addUserData(), but keeps songs,
+playlists, settings and the per-path metadata cache in indexed tables and applies
+each change atomically.
+
+Enable with the PYTUNES_BACKEND=sqlite environment variable or
+getUserData.use_backend("sqlite").
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import getUserData as gud
+
+
+LIBRARY_DB_FILE = "library.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS songs (
+    id      TEXT PRIMARY KEY,
+    path    TEXT NOT NULL DEFAULT '',
+    title   TEXT NOT NULL DEFAULT '',
+    extra   TEXT                        -- any other keys of the song entry, as JSON
+);
+CREATE INDEX IF NOT EXISTS songs_path ON songs(path);
+CREATE INDEX IF NOT EXISTS songs_title ON songs(title COLLATE NOCASE);
+
+-- per-file tag/length cache (user.json's song_meta + song_lengths), keyed by path
+CREATE TABLE IF NOT EXISTS tracks (
+    path    TEXT PRIMARY KEY,
+    artist  TEXT,
+    album   TEXT,
+    length  REAL,
+    year    TEXT
+);
+CREATE INDEX IF NOT EXISTS tracks_artist ON tracks(artist COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS tracks_album ON tracks(album COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS tracks_length ON tracks(length);
+
+CREATE TABLE IF NOT EXISTS playlists (
+    id      TEXT PRIMARY KEY,
+    name    TEXT NOT NULL DEFAULT '',
+    extra   TEXT
+);
+CREATE INDEX IF NOT EXISTS playlists_name ON playlists(name);
+
+CREATE TABLE IF NOT EXISTS playlist_songs (
+    playlist_id TEXT NOT NULL REFERENCES playlists(id) ON DELETE CASCADE,
+    position    INTEGER NOT NULL,
+    song_id     TEXT NOT NULL,
+    PRIMARY KEY (playlist_id, position)
+);
+CREATE INDEX IF NOT EXISTS playlist_songs_song ON playlist_songs(song_id);
+
+CREATE TABLE IF NOT EXISTS settings (
+    key     TEXT PRIMARY KEY,
+    value   TEXT
+);
+
+-- top-level keys that have no table of their own
+CREATE TABLE IF NOT EXISTS extras (
+    key     TEXT PRIMARY KEY,
+    value   TEXT
+);
+
+CREATE TABLE IF NOT EXISTS db_info (
+    key     TEXT PRIMARY KEY,
+    value   TEXT
+);
+"""
+
+# sort menu value -> ORDER BY clause
+SORT_ORDERS = {
+    "title": "s.title COLLATE NOCASE, s.id",
+    "artist": "t.artist COLLATE NOCASE, s.title COLLATE NOCASE",
+    "album": "t.album COLLATE NOCASE, s.title COLLATE NOCASE",
+    "length": "COALESCE(t.length, 0), s.title COLLATE NOCASE",
+}
+
+
+class SQLiteUserDataStore(gud.WriteBehind, gud.ChangeNotifier):
+    """
+    UserDataStore look-alike that persists into an indexed SQLite database.
+
+    Each merge runs inside its own savepoint of one long-lived transaction;
+    flush() commits it, so bursts of merges cost a single disk sync.
+    """
+
+    def __init__(self, path=LIBRARY_DB_FILE, json_dir=gud.USERDATA_DIR, flush_interval=None):
+        self.path = path
+        self._lock = threading.RLock()
+        self._init_write_behind(flush_interval)
+        # autocommit mode: transactions are opened/committed explicitly below
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(SCHEMA)
+        self._upgrade_schema()
+        self._view = None
+        self._data_version = None
+
+        self.migrate_from_json(json_dir)
+
+    def _upgrade_schema(self):
+        """Add columns introduced after a database was created."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tracks)")}
+        if "year" not in columns:
+            self._conn.execute("ALTER TABLE tracks ADD COLUMN year TEXT")
+
+    # ------------------ cache bookkeeping ------------------
+
+    def revalidate(self):
+        """Drop the materialised view if another connection committed changes."""
+        with self._locked():
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._data_version:
+                return False
+            self._data_version = version
+            self._changed()
+            return True
+
+    def _changed(self, keys=()):
+        self._view = None
+        self._notify(keys or gud.ALL_SECTIONS)
+
+    @contextmanager
+    def _savepoint(self):
+        """Run a block atomically inside the pending write-behind transaction."""
+        if not self._conn.in_transaction:
+            self._conn.execute("BEGIN")
+        self._conn.execute("SAVEPOINT change")
+        try:
+            yield
+        except Exception:
+            self._conn.execute("ROLLBACK TO change")
+            self._conn.execute("RELEASE change")
+            raise
+        self._conn.execute("RELEASE change")
+
+    def _write_pending(self):
+        try:
+            if self._conn.in_transaction:
+                self._conn.execute("COMMIT")
+        except Exception as e:
+            print(f"[libraryDB] Error committing data: {e}")
+            return False
+        return True
+
+    def _info(self, key):
+        row = self._conn.execute("SELECT value FROM db_info WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    # ------------------ migration ------------------
+
+    def migrate_from_json(self, json_dir):
+        """
+        One-shot import of the existing JSON user data. It is read through
+        gud.UserDataStore, so a legacy user.json is first split into section files
+        under `json_dir`, as the JSON backend would do; user.json itself and any
+        existing section files are only read.
+        """
+        with self._locked():
+            if self._info("migrated_from") is not None or not json_dir:
+                return False
+            data = gud.UserDataStore(path=json_dir, flush_interval=0).load()
+            if not data:
+                return False
+
+            with self._savepoint():
+                self._write_document(data[0])
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO db_info(key, value) VALUES ('migrated_from', ?)",
+                    (os.path.abspath(json_dir),)
+                )
+            self._dirty = True
+            self.flush()
+            self._changed()
+            return True
+
+    # ------------------ reading ------------------
+
+    def _is_empty(self):
+        for table in ("songs", "playlists", "settings", "tracks", "extras"):
+            if self._conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+                return False
+        return True
+
+    def _materialise(self):
+        """Rebuild the user.json-shaped document from the tables."""
+        if self._is_empty():
+            return False
+
+        c = self._conn
+        user = {}
+
+        songs = {}
+        for sid, path, title, extra in c.execute("SELECT id, path, title, extra FROM songs"):
+            entry = json.loads(extra) if extra else {}
+            entry["name"] = title
+            entry["loc"] = path
+            songs[sid] = entry
+        user["songs"] = songs
+
+        members = {}
+        for pid, sid in c.execute("SELECT playlist_id, song_id FROM playlist_songs ORDER BY playlist_id, position"):
+            members.setdefault(pid, []).append(sid)
+        playlists = {}
+        for pid, name, extra in c.execute("SELECT id, name, extra FROM playlists"):
+            entry = json.loads(extra) if extra else {}
+            entry["name"] = name
+            entry["songs"] = members.get(pid, [])
+            playlists[pid] = entry
+        user["playlists"] = playlists
+
+        user["settings"] = {k: json.loads(v) for k, v in c.execute("SELECT key, value FROM settings")}
+
+        song_meta = {}
+        song_lengths = {}
+        for path, artist, album, year, length in c.execute("SELECT path, artist, album, year, length FROM tracks"):
+            if artist is not None or album is not None or year is not None:
+                song_meta[path] = {"artist": artist or "", "album": album or "", "year": year or ""}
+            if length is not None:
+                song_lengths[path] = length
+        if song_meta:
+            user["song_meta"] = song_meta
+        if song_lengths:
+            user["song_lengths"] = song_lengths
+
+        for k, v in c.execute("SELECT key, value FROM extras"):
+            user[k] = json.loads(v)
+
+        return [user]
+
+    def view(self):
+        """Return a read-only view of the document, or False if the database is empty."""
+        with self._locked():
+            self.revalidate()
+            if self._view is None:
+                data = self._materialise()
+                self._view = gud._freeze(data) if data else False
+            return self._view
+
+    def load(self):
+        """Return a private mutable copy of the document, or False if the database is empty."""
+        view = self.view()
+        return gud.mutable_copy(view) if view else False
+
+    # ------------------ indexed queries ------------------
+
+    def query_song_ids(self, query="", sort="title"):
+        """Return song ids matching `query` (title/artist/album substring), ordered by `sort`."""
+        order = SORT_ORDERS.get((sort or "title").lower(), SORT_ORDERS["title"])
+        sql = "SELECT s.id FROM songs s LEFT JOIN tracks t ON t.path = s.path"
+        params = ()
+        if query:
+            # the user's text is matched literally: % and _ are not wildcards here
+            escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            like = f"%{escaped}%"
+            sql += (" WHERE s.title LIKE ? ESCAPE '\\' OR t.artist LIKE ? ESCAPE '\\'"
+                    " OR t.album LIKE ? ESCAPE '\\'")
+            params = (like, like, like)
+        with self._locked():
+            return [row[0] for row in self._conn.execute(f"{sql} ORDER BY {order}", params)]
+
+    # ------------------ writing ------------------
+
+    def _put_song(self, sid, entry):
+        entry = dict(entry or {})
+        path = str(entry.pop("loc", "") or "")
+        title = str(entry.pop("name", "") or "")
+        self._conn.execute(
+            "INSERT OR REPLACE INTO songs(id, path, title, extra) VALUES (?, ?, ?, ?)",
+            (sid, path, title, json.dumps(entry) if entry else None)
+        )
+
+    def _put_playlist(self, pid, entry):
+        entry = dict(entry or {})
+        name = str(entry.pop("name", "") or "")
+        song_ids = list(entry.pop("songs", []) or [])
+        self._conn.execute(
+            "INSERT OR REPLACE INTO playlists(id, name, extra) VALUES (?, ?, ?)",
+            (pid, name, json.dumps(entry) if entry else None)
+        )
+        self._conn.execute("DELETE FROM playlist_songs WHERE playlist_id = ?", (pid,))
+        self._conn.executemany(
+            "INSERT INTO playlist_songs(playlist_id, position, song_id) VALUES (?, ?, ?)",
+            [(pid, pos, sid) for pos, sid in enumerate(song_ids)]
+        )
+
+    def _put_settings(self, settings):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO settings(key, value) VALUES (?, ?)",
+            [(k, json.dumps(v)) for k, v in settings.items()]
+        )
+
+    def _replace_track_column(self, columns, entries, merge=False):
+        """Replace (or with merge=True, upsert into) one slice of the tracks table."""
+        if not merge:
+            sets = ", ".join(f"{col} = NULL" for col in columns)
+            self._conn.execute(f"UPDATE tracks SET {sets}")
+        for path, values in entries.items():
+            self._conn.execute("INSERT OR IGNORE INTO tracks(path) VALUES (?)", (path,))
+            assign = ", ".join(f"{col} = ?" for col in columns)
+            self._conn.execute(f"UPDATE tracks SET {assign} WHERE path = ?", (*values, path))
+        self._drop_empty_tracks()
+
+    def _drop_empty_tracks(self):
+        self._conn.execute(
+            "DELETE FROM tracks WHERE artist IS NULL AND album IS NULL AND year IS NULL AND length IS NULL"
+        )
+
+    def _put_key(self, key, value, merge=False):
+        """Write one top-level key; song_meta/song_lengths are upserted when merge=True."""
+        if key == "song_meta" and isinstance(value, dict):
+            self._replace_track_column(
+                ("artist", "album", "year"),
+                {p: ((m or {}).get("artist", ""), (m or {}).get("album", ""), str((m or {}).get("year", "") or ""))
+                 for p, m in value.items()},
+                merge
+            )
+        elif key == "song_lengths" and isinstance(value, dict):
+            self._replace_track_column(
+                ("length",), {p: (float(v) if v is not None else None,) for p, v in value.items()}, merge
+            )
+        else:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extras(key, value) VALUES (?, ?)", (key, json.dumps(value))
+            )
+
+    def _write_document(self, user):
+        for table in ("playlist_songs", "playlists", "songs", "settings", "tracks", "extras"):
+            self._conn.execute(f"DELETE FROM {table}")
+        for key, value in user.items():
+            if key == "songs" and isinstance(value, dict):
+                for sid, entry in value.items():
+                    self._put_song(sid, entry)
+            elif key == "playlists" and isinstance(value, dict):
+                for pid, entry in value.items():
+                    self._put_playlist(pid, entry)
+            elif key == "settings" and isinstance(value, dict):
+                self._put_settings(value)
+            else:
+                self._put_key(key, value)
+
+    def replace(self, data):
+        """Overwrite the whole library in one transaction."""
+        data = gud._normalise(gud.mutable_copy(data))
+        if not data:
+            return False
+        with self._locked():
+            try:
+                with self._savepoint():
+                    self._write_document(data[0])
+            except Exception as e:
+                print(f"[libraryDB] Error saving data: {e}")
+                return False
+            self._dirty = True
+            self._changed()
+            return self.flush()
+
+    def merge(self, new_data):
+        """Transactional equivalent of getUserData.addUserData's merge rules."""
+        with self._locked():
+            try:
+                with self._savepoint():
+                    for key, value in new_data.items():
+                        if key == "playlists":
+                            if not isinstance(value, dict):
+                                continue
+                            if "name" in value and "songs" in value:
+                                exists = self._conn.execute(
+                                    "SELECT 1 FROM playlists WHERE name = ?", (value["name"],)
+                                ).fetchone()
+                                if not exists:
+                                    count = self._conn.execute("SELECT COUNT(*) FROM playlists").fetchone()[0]
+                                    self._put_playlist(f"playlist{count + 1}", value)
+                            else:
+                                for pid, entry in value.items():
+                                    exists = self._conn.execute(
+                                        "SELECT 1 FROM playlists WHERE id = ?", (pid,)
+                                    ).fetchone()
+                                    if not exists:
+                                        self._put_playlist(pid, entry)
+
+                        elif key == "songs":
+                            if isinstance(value, dict):
+                                for sid, entry in value.items():
+                                    self._put_song(sid, entry)
+
+                        elif key == "settings":
+                            if isinstance(value, dict):
+                                self._put_settings(value)
+
+                        elif key in ("song_meta", "song_lengths"):
+                            self._put_key(key, value, merge=True)
+
+                        else:
+                            self._put_key(key, value)
+            except Exception as e:
+                print(f"[libraryDB] Error merging data: {e}")
+                return False
+            self._changed(new_data)
+            self._schedule_flush()
+            return True
+
+    def remove(self, entries):
+        """Delete entries from the songs/playlists/settings/song_meta/song_lengths sections."""
+        with self._locked():
+            changed = set()
+            try:
+                with self._savepoint():
+                    for key, ids in entries.items():
+                        ids = list(ids or ())
+                        if not ids:
+                            continue
+                        if key == "songs":
+                            sql = "DELETE FROM songs WHERE id = ?"
+                        elif key == "playlists":
+                            sql = "DELETE FROM playlists WHERE id = ?"
+                        elif key == "settings":
+                            sql = "DELETE FROM settings WHERE key = ?"
+                        elif key == "song_meta":
+                            sql = "UPDATE tracks SET artist = NULL, album = NULL, year = NULL WHERE path = ?"
+                        elif key == "song_lengths":
+                            sql = "UPDATE tracks SET length = NULL WHERE path = ?"
+                        else:
+                            continue
+                        self._conn.executemany(sql, [(i,) for i in ids])
+                        changed.add(key)
+                    self._drop_empty_tracks()
+            except Exception as e:
+                print(f"[libraryDB] Error removing data: {e}")
+                return False
+            if changed:
+                self._changed(changed)
+                self._schedule_flush()
+            return True
+
+    def close(self):
+        with self._locked():
+            self.flush()
+            self._conn.close()
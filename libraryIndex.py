@@ -0,0 +1,211 @@
+"""
+Artist -> album -> track aggregation index.
+
+Built from metaCache entries and kept up to date by it: every cached tag read
+moves the track into its (artist, album) bucket and every invalidation takes it
+out again, so counts and total durations are always ready without touching the
+rest of the library. Saved as cache/library_index.json alongside
+cache/metadata.json; a generation number shared by both files detects an index
+that fell out of step (e.g. a crash between the two writes) and rebuilds it.
+"""
+
+import json
+import os
+
+
+INDEX_FILE = "library_index.json"
+INDEX_VERSION = 1
+UNKNOWN = ""    # bucket for tracks with no artist/album tag
+
+
+def group_key(name):
+    return (name or "").strip().casefold()
+
+
+class Album:
+    __slots__ = ("name", "tracks", "duration")
+
+    def __init__(self, name):
+        self.name = name
+        self.tracks = {}        # path -> length
+        self.duration = 0.0
+
+
+class Artist:
+    __slots__ = ("name", "albums", "track_count", "duration")
+
+    def __init__(self, name):
+        self.name = name
+        self.albums = {}        # album key -> Album
+        self.track_count = 0
+        self.duration = 0.0
+
+
+class LibraryIndex:
+
+    def __init__(self, path):
+        self.path = path
+        self.generation = 0
+        self._artists = {}      # artist key -> Artist
+        self._placement = {}    # path -> (artist key, album key)
+
+    # ------------------ maintenance ------------------
+
+    def add(self, path, artist, album, length):
+        """Place (or move) one track; a repeated add for the same path replaces it."""
+        self.remove(path)
+        akey, alkey = group_key(artist), group_key(album)
+        length = float(length or 0.0)
+
+        entry = self._artists.get(akey)
+        if entry is None:
+            entry = self._artists[akey] = Artist((artist or "").strip())
+        bucket = entry.albums.get(alkey)
+        if bucket is None:
+            bucket = entry.albums[alkey] = Album((album or "").strip())
+
+        bucket.tracks[path] = length
+        bucket.duration += length
+        entry.track_count += 1
+        entry.duration += length
+        self._placement[path] = (akey, alkey)
+
+    def remove(self, path):
+        placement = self._placement.pop(path, None)
+        if placement is None:
+            return False
+        akey, alkey = placement
+        entry = self._artists[akey]
+        bucket = entry.albums[alkey]
+        length = bucket.tracks.pop(path, 0.0)
+        bucket.duration -= length
+        entry.track_count -= 1
+        entry.duration -= length
+        if not bucket.tracks:
+            del entry.albums[alkey]
+        if not entry.albums:
+            del self._artists[akey]
+        return True
+
+    def rebuild(self, entries):
+        """Recreate the index from metaCache entries (path -> [size, mtime, artist, album, year, length])."""
+        self._artists = {}
+        self._placement = {}
+        for path, e in entries.items():
+            self.add(path, e[2], e[3], e[5])
+
+    # ------------------ persistence ------------------
+
+    def load(self, generation):
+        """Load the saved index; False if it is missing or not from `generation`."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"[LibraryIndex] Error reading {self.path}: {e}")
+            return False
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION or data.get("generation") != generation:
+            return False
+
+        self._artists = {}
+        self._placement = {}
+        for akey, a in (data.get("artists") or {}).items():
+            entry = self._artists[akey] = Artist(a.get("name", ""))
+            for alkey, al in (a.get("albums") or {}).items():
+                bucket = entry.albums[alkey] = Album(al.get("name", ""))
+                bucket.tracks = dict(al.get("tracks") or {})
+                bucket.duration = sum(bucket.tracks.values())
+                entry.track_count += len(bucket.tracks)
+                entry.duration += bucket.duration
+                for path in bucket.tracks:
+                    self._placement[path] = (akey, alkey)
+        self.generation = generation
+        return True
+
+    def save(self, generation):
+        data = {
+            "version": INDEX_VERSION,
+            "generation": generation,
+            "artists": {
+                akey: {
+                    "name": a.name,
+                    "albums": {alkey: {"name": al.name, "tracks": al.tracks} for alkey, al in a.albums.items()},
+                }
+                for akey, a in self._artists.items()
+            },
+        }
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"[LibraryIndex] Error saving {self.path}: {e}")
+            return False
+        self.generation = generation
+        return True
+
+    # ------------------ queries ------------------
+
+    def __len__(self):
+        return len(self._placement)
+
+    def __contains__(self, path):
+        return path in self._placement
+
+    @property
+    def total_duration(self):
+        return sum(a.duration for a in self._artists.values())
+
+    def artists(self):
+        """[(artist, album count, track count, duration)] ordered by name; "" is untagged."""
+        return [
+            (a.name, len(a.albums), a.track_count, a.duration)
+            for _k, a in sorted(self._artists.items())
+        ]
+
+    def albums(self, artist=None):
+        """[(artist, album, track count, duration)] for one artist, or all ordered by album."""
+        if artist is not None:
+            entry = self._artists.get(group_key(artist))
+            if entry is None:
+                return []
+            return [(entry.name, al.name, len(al.tracks), al.duration) for _k, al in sorted(entry.albums.items())]
+        rows = [
+            (alkey, akey, a.name, al.name, len(al.tracks), al.duration)
+            for akey, a in self._artists.items() for alkey, al in a.albums.items()
+        ]
+        rows.sort()
+        return [row[2:] for row in rows]
+
+    def tracks(self, artist, album=None):
+        """Paths of the tracks by `artist` (optionally on one `album`)."""
+        entry = self._artists.get(group_key(artist))
+        if entry is None:
+            return []
+        if album is not None:
+            bucket = entry.albums.get(group_key(album))
+            return list(bucket.tracks) if bucket else []
+        return [path for _k, al in sorted(entry.albums.items()) for path in al.tracks]
+
+    def groups(self, by="artist"):
+        """
+        Yield lists of paths grouped by artist or album, groups in name order.
+        Lets a view sort by group without looking up any per-track tags.
+        """
+        if by == "artist":
+            for _akey, a in sorted(self._artists.items()):
+                yield [path for al in a.albums.values() for path in al.tracks]
+        else:
+            merged = {}
+            for a in self._artists.values():
+                for alkey, al in a.albums.items():
+                    merged.setdefault(alkey, []).extend(al.tracks)
+            for alkey in sorted(merged):
+                yield merged[alkey]
+
+    def placement(self, path):
+        """(artist key, album key) the track is filed under, or None."""
+        return self._placement.get(path)
@@ -0,0 +1,302 @@
+"""
+Incremental scanner for the Music folder.
+
+Keeps a manifest of (size, mtime_ns) per file from the previous scan, walks the
+tree with os.scandir and reports only what was added, removed or modified, so
+an unchanged library costs one stat per file and no tag reads at all.
+
+Song ids are derived from the file itself (normalised relative path plus a
+hash of its first/last few KiB) rather than from enumeration order, so the
+same library always produces the same ids.
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+import unicodedata
+
+import getUserData as gud
+import loudness
+import metaCache
+
+
+MUSIC_DIR = "Music"
+MANIFEST_FILE = "scan_manifest.json"
+PARTIAL_HASH_BYTES = 16 * 1024     # read from each end of the file for the id
+LEGACY_SONG_ID = re.compile(r"song\d+")
+
+AUDIO_EXTENSIONS = {
+    ".mp3", ".flac", ".ogg", ".oga", ".opus", ".wav", ".aif", ".aiff",
+    ".m4a", ".mp4", ".aac", ".wma",
+}
+
+
+class ScanResult:
+    """What changed on disk since the previous scan (lists of absolute paths)."""
+
+    __slots__ = ("added", "removed", "modified", "unchanged", "elapsed")
+
+    def __init__(self, added, removed, modified, unchanged, elapsed):
+        self.added = added
+        self.removed = removed
+        self.modified = modified
+        self.unchanged = unchanged
+        self.elapsed = elapsed
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.modified)
+
+    def __repr__(self):
+        return (f"ScanResult(added={len(self.added)}, removed={len(self.removed)}, "
+                f"modified={len(self.modified)}, unchanged={self.unchanged}, elapsed={self.elapsed:.3f}s)")
+
+
+def is_audio_file(path):
+    return os.path.splitext(path)[1].lower() in AUDIO_EXTENSIONS
+
+
+def walk(root):
+    """Yield (path, size, mtime_ns) for every audio file below `root`."""
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=True):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=True) and is_audio_file(entry.name):
+                            st = entry.stat()
+                            yield entry.path, st.st_size, st.st_mtime_ns
+                    except OSError:
+                        continue    # vanished or unreadable mid-scan
+        except OSError:
+            continue
+
+
+class LibraryScanner:
+    """Diffs the Music folder against the manifest saved by the previous scan."""
+
+    def __init__(self, root=MUSIC_DIR, manifest_path=None):
+        self.root = os.path.realpath(root)
+        self.manifest_path = manifest_path or os.path.join(gud.getCacheDir(), MANIFEST_FILE)
+        self.manifest = self._load_manifest()   # path -> [size, mtime_ns]
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get("root") == self.root:
+                return dict(data.get("files", {}))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[LibraryScanner] Error reading manifest: {e}")
+        return {}
+
+    def save(self):
+        tmp_path = f"{self.manifest_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"root": self.root, "files": self.manifest}, f, separators=(",", ":"))
+            os.replace(tmp_path, self.manifest_path)
+            return True
+        except Exception as e:
+            print(f"[LibraryScanner] Error saving manifest: {e}")
+            return False
+
+    def scan(self, save=True, paths=None):
+        """
+        Walk the tree, update the manifest and return a ScanResult.
+        With `paths`, only those files/subtrees are re-examined (used by the folder watcher).
+        """
+        started = time.perf_counter()
+        previous = self.manifest
+
+        if paths is None:
+            covered = None
+            found = walk(self.root)
+        else:
+            prefixes = {os.path.realpath(p) for p in paths}
+            covered = tuple(p.rstrip(os.sep) + os.sep for p in prefixes)
+            found = self._walk_paths(sorted(prefixes))
+
+        current = {}
+        added, modified = [], []
+        for path, size, mtime_ns in found:
+            if path in current:
+                continue    # a file and its parent directory were both queued
+            current[path] = [size, mtime_ns]
+            old = previous.get(path)
+            if old is None:
+                added.append(path)
+            elif old[0] != size or old[1] != mtime_ns:
+                modified.append(path)
+
+        if covered is None:
+            removed = sorted(path for path in previous if path not in current)
+            self.manifest = current
+            unchanged = len(current) - len(added) - len(modified)
+        else:
+            removed = sorted(
+                path for path in previous
+                if path not in current and (path in prefixes or path.startswith(covered))
+            )
+            for path in removed:
+                del previous[path]
+            previous.update(current)
+            unchanged = len(current) - len(added) - len(modified)
+
+        added.sort()
+        modified.sort()
+        result = ScanResult(added, removed, modified, unchanged, time.perf_counter() - started)
+        if save and (result or not os.path.exists(self.manifest_path)):
+            self.save()
+        return result
+
+    def _walk_paths(self, paths):
+        for path in paths:
+            if os.path.isdir(path):
+                yield from walk(path)
+            elif is_audio_file(path):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_size, st.st_mtime_ns
+
+
+def _relative_key(path, root):
+    """Normalised path of `path` relative to the library root (absolute if outside it)."""
+    path = os.path.realpath(path)
+    root = os.path.realpath(root)
+    if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+        path = os.path.relpath(path, root)
+    path = os.path.normcase(path).replace(os.sep, "/")
+    return unicodedata.normalize("NFC", path)
+
+
+def content_hash(path):
+    """Fast partial hash: file size plus the first and last PARTIAL_HASH_BYTES."""
+    h = hashlib.blake2b(digest_size=8)
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            h.update(size.to_bytes(8, "little"))
+            h.update(f.read(PARTIAL_HASH_BYTES))
+            if size > 2 * PARTIAL_HASH_BYTES:
+                f.seek(-PARTIAL_HASH_BYTES, os.SEEK_END)
+                h.update(f.read(PARTIAL_HASH_BYTES))
+    except OSError:
+        pass    # missing file: the id then depends on the path alone
+    return h.digest()
+
+
+def song_id(path, root=MUSIC_DIR):
+    """Stable id for the song at `path`; the same file always gets the same id."""
+    h = hashlib.blake2b(digest_size=8)
+    h.update(_relative_key(path, root).encode("utf-8"))
+    h.update(b"\0")
+    h.update(content_hash(path))
+    return f"s{h.hexdigest()}"
+
+
+def migrate_song_ids(root=MUSIC_DIR):
+    """
+    Rename legacy enumeration-order 'songN' ids to stable ids, rewriting playlist
+    membership to match. Returns the {old: new} mapping (empty if nothing to do).
+    """
+    data = gud.getUserDataView()
+    if not data:
+        return {}
+    user = data[0]
+    songs = user.get("songs", {}) or {}
+    legacy = [sid for sid in songs if LEGACY_SONG_ID.fullmatch(sid)]
+    if not legacy:
+        return {}
+
+    renamed = {}
+    for sid in legacy:
+        loc = (songs[sid] or {}).get("loc", "")
+        if loc:
+            renamed[sid] = song_id(loc, root)
+
+    user = gud.mutable_copy(user)
+    new_songs = {}
+    for sid, meta in user["songs"].items():
+        new_songs.setdefault(renamed.get(sid, sid), meta)
+    user["songs"] = new_songs
+    for playlist in (user.get("playlists", {}) or {}).values():
+        if isinstance(playlist, dict) and isinstance(playlist.get("songs"), list):
+            playlist["songs"] = [renamed.get(sid, sid) for sid in playlist["songs"]]
+
+    if gud.setUserData(user) is False:
+        return {}
+    print(f"[migrate_song_ids] Renamed {len(renamed)} legacy song ids")
+    return renamed
+
+
+def apply_scan(result, root=MUSIC_DIR):
+    """
+    Write a ScanResult into the user data: new songs are added, songs whose file
+    disappeared are dropped, and cached tags/lengths of modified files are
+    invalidated so they get re-read.
+    """
+    data = gud.getUserDataView()
+    songs = (data[0].get("songs", {}) or {}) if data else {}
+    ids_by_loc = {(meta or {}).get("loc", ""): sid for sid, meta in songs.items()}
+
+    new_songs = {}
+    for path in result.added:
+        if path in ids_by_loc:
+            continue    # already in the library (e.g. first scan with no manifest yet)
+        sid = song_id(path, root)
+        new_songs[sid] = {
+            "name": os.path.splitext(os.path.basename(path))[0],
+            "loc": path,
+        }
+        ids_by_loc[path] = sid
+
+    stale_paths = list(result.removed) + list(result.modified)
+    metaCache.get_cache().invalidate(stale_paths)
+    loudness.get_cache().invalidate(stale_paths)
+    removals = {
+        "songs": [ids_by_loc[p] for p in result.removed if p in ids_by_loc],
+        "song_meta": stale_paths,
+        "song_lengths": stale_paths,
+    }
+
+    if any(removals.values()):
+        gud.removeUserData(removals)
+    if new_songs:
+        gud.addUserData({"songs": new_songs})
+    return new_songs
+
+
+def sync_library(root=MUSIC_DIR, paths=None, scanner=None):
+    """
+    Scan `root` incrementally (or just `paths` below it) and apply the
+    differences to the user data.
+    """
+    scanner = scanner or LibraryScanner(root)
+    if paths is None:
+        migrate_song_ids(scanner.root)
+    result = scanner.scan(save=False, paths=paths)
+    if result:
+        apply_scan(result, scanner.root)
+    # only remember the new state once it has made it into the user data
+    if result or not os.path.exists(scanner.manifest_path):
+        scanner.save()
+    if paths is None:
+        metaCache.get_cache().evict_missing(known=scanner.manifest)
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+    print(sync_library(sys.argv[1] if len(sys.argv) > 1 else MUSIC_DIR))
+    metaCache.get_cache().flush()
+    gud.flush()
@@ -0,0 +1,382 @@
+"""
+Offline loudness analysis (ReplayGain-style track gain).
+
+Tracks are decoded in a low-priority worker process and measured with an
+ITU-R BS.1770 style integrated loudness (K-weighting applied per 100 ms
+sub-block in the frequency domain, 400 ms gated blocks) plus sample peak, all
+vectorised with NumPy. Results are cached per file in cache/loudness.json,
+validated by size and mtime like metaCache, and flushed as they arrive, so an
+interrupted run resumes where it stopped. AudioBackend turns the cached value
+into a playback gain.
+
+NumPy is optional: without it analysis is skipped and playback is unchanged.
+"""
+
+import atexit
+import json
+import math
+import os
+import threading
+import time
+import wave
+from collections import deque
+
+import getUserData as gud
+
+
+LOUDNESS_FILE = "loudness.json"
+CACHE_VERSION = 1
+TARGET_LUFS = -18.0         # ReplayGain 2 reference level
+THROTTLE_SECONDS = 0.25     # pause between tracks so analysis never hogs the CPU
+WORKER_NICENESS = 10
+REPLAYGAIN_ENABLED = os.getenv("PYTUNES_REPLAYGAIN", "1") == "1"
+
+SUBBLOCK_SECONDS = 0.1      # 400 ms gating blocks are built from four of these
+CHUNK_SUBBLOCKS = 600       # FFT this many sub-blocks at a time to bound memory
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+
+
+# ------------------ measurement (runs in the worker) ------------------
+
+def _biquad_response(b, a, freqs, rate):
+    import numpy as np
+    z = np.exp(-2j * np.pi * freqs / rate)
+    return np.abs((b[0] + b[1] * z + b[2] * z * z) / (1.0 + a[0] * z + a[1] * z * z)) ** 2
+
+
+def k_weighting_power(freqs, rate):
+    """|H(f)|^2 of the BS.1770 K-weighting filter (high shelf + high-pass) at `rate`."""
+    # stage 1: high shelf
+    gain_db, f0, q = 3.999843853973347, 1681.974450955533, 0.7071752369554196
+    k = math.tan(math.pi * f0 / rate)
+    vh = 10 ** (gain_db / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = _biquad_response(
+        ((vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0),
+        (2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0),
+        freqs, rate,
+    )
+    # stage 2: high-pass
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = math.tan(math.pi * f0 / rate)
+    a0 = 1 + k / q + k * k
+    highpass = _biquad_response(
+        (1.0, -2.0, 1.0),
+        (2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0),
+        freqs, rate,
+    )
+    return shelf * highpass
+
+
+def measure(samples, rate):
+    """
+    Return (integrated loudness in LUFS, sample peak) for float samples shaped
+    (frames, channels) in [-1, 1]. Loudness is None for silence.
+    """
+    import numpy as np
+    samples = np.asarray(samples, dtype=np.float64)
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    peak = float(np.max(np.abs(samples))) if samples.size else 0.0
+
+    n = int(rate * SUBBLOCK_SECONDS)
+    count = samples.shape[0] // n
+    if count < 4:
+        return None, peak
+    weights = k_weighting_power(np.fft.rfftfreq(n, 1.0 / rate), rate)
+    parseval = np.full(weights.shape, 2.0)
+    parseval[0] = 1.0
+    if n % 2 == 0:
+        parseval[-1] = 1.0
+    weights = weights * parseval / (n * n)
+
+    # mean square of the K-weighted signal per 100 ms sub-block and channel
+    energies = np.empty((count, samples.shape[1]))
+    for start in range(0, count, CHUNK_SUBBLOCKS):
+        stop = min(count, start + CHUNK_SUBBLOCKS)
+        blocks = samples[start * n:stop * n].reshape(stop - start, n, -1)
+        spectrum = np.fft.rfft(blocks, axis=1)
+        energies[start:stop] = np.einsum("bfc,f->bc", spectrum.real ** 2 + spectrum.imag ** 2, weights)
+
+    # 400 ms blocks with 75 % overlap = sliding mean of four sub-blocks
+    csum = np.cumsum(np.vstack([np.zeros((1, energies.shape[1])), energies]), axis=0)
+    block_energy = ((csum[4:] - csum[:-4]) / 4.0).sum(axis=1)   # channel weights G = 1 (L/R)
+
+    with np.errstate(divide="ignore"):
+        block_loudness = -0.691 + 10 * np.log10(block_energy)
+    gated = block_energy[block_loudness > ABSOLUTE_GATE]
+    if not gated.size:
+        return None, peak
+    relative = -0.691 + 10 * np.log10(gated.mean()) + RELATIVE_GATE
+    gated = block_energy[(block_loudness > ABSOLUTE_GATE) & (block_loudness > relative)]
+    return float(-0.691 + 10 * np.log10(gated.mean())), peak
+
+
+def _decode_wav(path):
+    import numpy as np
+    with wave.open(path, "rb") as w:
+        width, channels, rate = w.getsampwidth(), w.getnchannels(), w.getframerate()
+        raw = w.readframes(w.getnframes())
+    if width == 1:
+        data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        data = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 4:
+        data = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"unsupported sample width {width}")
+    return data.reshape(-1, channels), rate
+
+
+def _decode_pygame(path):
+    import numpy as np
+    import pygame  # type: ignore
+    if not pygame.mixer.get_init():
+        pygame.mixer.init(frequency=44100, size=-16, channels=2)
+    rate, _size, _channels = pygame.mixer.get_init()
+    data = pygame.sndarray.array(pygame.mixer.Sound(path))
+    return data.astype(np.float32) / 32768.0, rate
+
+
+def decode(path):
+    """Return (float samples (frames, channels), sample rate) for `path`."""
+    if path.lower().endswith(".wav"):
+        try:
+            return _decode_wav(path)
+        except Exception:
+            pass    # compressed/float wavs: let SDL have a go
+    return _decode_pygame(path)
+
+
+def worker_init():
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")   # decode only, never open a device
+    try:
+        os.nice(WORKER_NICENESS)
+    except (AttributeError, OSError):
+        pass
+
+
+def analyse(path):
+    """Return (path, loudness LUFS or None, peak or None). Worker entry point."""
+    try:
+        samples, rate = decode(path)
+        loudness, peak = measure(samples, rate)
+        return path, loudness, peak
+    except Exception:
+        return path, None, None
+
+
+def gain_for(loudness, peak, target=TARGET_LUFS):
+    """Track gain in dB towards `target`, limited so the peak does not clip."""
+    if loudness is None:
+        return 0.0
+    gain = target - loudness
+    if peak:
+        gain = min(gain, -20 * math.log10(peak))
+    return gain
+
+
+# ------------------ cache ------------------
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+        return [st.st_size, st.st_mtime_ns]
+    except OSError:
+        return None
+
+
+class LoudnessCache(gud.WriteBehind):
+    """path -> [size, mtime_ns, loudness, peak]; a failed analysis is cached as None/None."""
+
+    def __init__(self, path=None, flush_interval=None):
+        self.path = path or os.path.join(gud.getCacheDir(), LOUDNESS_FILE)
+        self._lock = threading.RLock()
+        self._init_write_behind(flush_interval)
+        self._entries = {}
+        self._checked = set()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get("version") == CACHE_VERSION:
+                self._entries = {p: e for p, e in (data.get("entries") or {}).items()
+                                 if isinstance(e, list) and len(e) == 4}
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[LoudnessCache] Error reading {self.path}: {e}")
+
+    def _write_pending(self):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "entries": self._entries}, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+            return True
+        except Exception as e:
+            print(f"[LoudnessCache] Error saving {self.path}: {e}")
+            return False
+
+    def get(self, path):
+        """(loudness, peak) for `path`, or None if it has not been analysed since it last changed."""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and path not in self._checked:
+                self._checked.add(path)
+                if _signature(path) != entry[:2]:
+                    del self._entries[path]
+                    self._schedule_flush()
+                    return None
+            return (entry[2], entry[3]) if entry is not None else None
+
+    def __contains__(self, path):
+        return self.get(path) is not None
+
+    def put(self, path, loudness, peak):
+        sig = _signature(path)
+        if sig is None:
+            return
+        with self._lock:
+            self._entries[path] = sig + [loudness, peak]
+            self._checked.add(path)
+            self._schedule_flush()
+
+    def invalidate(self, paths):
+        with self._lock:
+            dropped = [p for p in paths if self._entries.pop(p, None) is not None]
+            self._checked.difference_update(paths)
+            if dropped:
+                self._schedule_flush()
+            return len(dropped)
+
+    def gain_db(self, path, target=TARGET_LUFS):
+        """Playback gain for `path` in dB (0.0 when unknown or disabled)."""
+        if not REPLAYGAIN_ENABLED:
+            return 0.0
+        result = self.get(path)
+        return gain_for(*result, target=target) if result else 0.0
+
+
+# ------------------ analyser ------------------
+
+class LoudnessAnalyser:
+    """
+    Background analysis queue: one low-priority worker process, one track at a
+    time with a pause in between. request() is incremental and idempotent; call
+    it with the library on start-up and with scanner results afterwards.
+    """
+
+    def __init__(self, cache, throttle=THROTTLE_SECONDS, use_processes=True, on_result=None):
+        self.cache = cache
+        self.throttle = throttle
+        self.use_processes = use_processes
+        self.on_result = on_result
+        self._queue = deque()
+        self._queued = set()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._executor = None
+        self._thread = None
+
+    @staticmethod
+    def available():
+        try:
+            import numpy  # noqa: F401  # type: ignore
+            return True
+        except ImportError:
+            return False
+
+    def request(self, paths):
+        """
+        Queue `paths` for analysis; returns how many were added. Paths already in
+        the cache are skipped by the analyser thread, so this never touches the disk.
+        """
+        if not self.available():
+            return 0
+        with self._cond:
+            added = 0
+            for path in paths:
+                if path and path not in self._queued:
+                    self._queued.add(path)
+                    self._queue.append(path)
+                    added += 1
+            if added:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="loudness", daemon=True)
+                    self._thread.start()
+                self._cond.notify()
+            return added
+
+    def _get_executor(self):
+        if self._executor is None:
+            from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+            if self.use_processes:
+                import multiprocessing
+                self._executor = ProcessPoolExecutor(
+                    max_workers=1, mp_context=multiprocessing.get_context("spawn"), initializer=worker_init
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="loudness")
+        return self._executor
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                path = self._queue.popleft()
+            if path in self.cache:      # stats the file; done here rather than on the caller's thread
+                with self._cond:
+                    self._queued.discard(path)
+                continue
+            try:
+                path, loudness, peak = self._get_executor().submit(analyse, path).result()
+            except Exception as e:
+                # the worker died (not the file being unreadable): start a fresh one and
+                # leave the path uncached so the next run retries it
+                print(f"[LoudnessAnalyser] Analysis failed for {path}: {e}")
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False, cancel_futures=True)
+                    self._executor = None
+                with self._cond:
+                    self._queued.discard(path)
+                time.sleep(self.throttle)
+                continue
+            self.cache.put(path, loudness, peak)
+            with self._cond:
+                self._queued.discard(path)
+            if self.on_result:
+                self.on_result(path)
+            time.sleep(self.throttle)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._queue.clear()
+            self._queued.clear()
+            self._cond.notify()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self.cache.flush()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    The process-wide cache, loaded on first use. Only the parent process calls
+    this; analysis workers import the module without loading or writing it.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LoudnessCache()
+            atexit.register(_cache.flush)
+        return _cache
@@ -0,0 +1,275 @@
+"""
+Persistent tag/length cache, validated against each file's size and mtime.
+
+Entries live in cache/metadata.json as path -> [size, mtime_ns, artist, album,
+year, length]. A path is stat'ed the first time it is looked up in a session;
+if the file was re-tagged or replaced since it was cached, the entry is dropped
+and reported as a miss. New entries are batched in memory and written behind
+the caller (gud.WriteBehind), so a cold library costs one write per batch
+rather than one per song.
+
+peek() skips that stat so views can list the library without file I/O; the
+background tag scan does the validating.
+
+On a backend with indexed queries (SQLite) each flushed batch is mirrored into
+its tracks table so artist/album/length sorting keeps working; entries cached
+while another backend was in use are copied over in full on the next start.
+
+The artist -> album -> track aggregation (libraryIndex) is maintained here as
+entries come and go, and saved in the same flush.
+"""
+
+import atexit
+import json
+import os
+import threading
+
+import getUserData as gud
+import libraryIndex
+
+
+METADATA_FILE = "metadata.json"
+CACHE_VERSION = 1
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+        return [st.st_size, st.st_mtime_ns]
+    except OSError:
+        return None
+
+
+class MetadataCache(gud.WriteBehind):
+
+    def __init__(self, path=None, flush_interval=None):
+        self.path = path or os.path.join(gud.getCacheDir(), METADATA_FILE)
+        self._lock = threading.RLock()
+        self._init_write_behind(flush_interval)
+        self._entries = {}      # path -> [size, mtime_ns, artist, album, year, length]
+        self._checked = set()   # paths validated against the disk this session
+        self._unmirrored = {}   # entries not yet copied to an indexed backend
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0     # bumped per flush; the index file must match it
+        self.mirrored = 0       # generation last fully copied to an indexed backend
+        self.index = libraryIndex.LibraryIndex(
+            os.path.join(os.path.dirname(self.path) or ".", libraryIndex.INDEX_FILE)
+        )
+        self._load()
+        if not self.index.load(self.generation):
+            self.index.rebuild(self._entries)
+            if self._entries:
+                self._schedule_flush()
+        if self.mirrored != self.generation and self._entries and gud.hasIndexedQueries():
+            # tags cached while another backend was in use have never reached this one
+            self._unmirrored = dict(self._entries)
+            self._schedule_flush()
+
+    # ------------------ persistence ------------------
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get("version") == CACHE_VERSION:
+                self._entries = {p: e for p, e in (data.get("entries") or {}).items()
+                                 if isinstance(e, list) and len(e) == 6}
+                self.generation = int(data.get("generation", 0))
+                self.mirrored = int(data.get("mirrored", 0))
+            return
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[MetadataCache] Error reading {self.path}: {e}")
+            return
+        self._import_user_data()
+
+    def _import_user_data(self):
+        """One-off: adopt the unvalidated song_meta/song_lengths sections, stamped as of now."""
+        data = gud.getUserDataView()
+        if not data:
+            return
+        song_meta = data[0].get("song_meta", {}) or {}
+        song_lengths = data[0].get("song_lengths", {}) or {}
+        for path in set(song_meta) | set(song_lengths):
+            sig = _signature(path)
+            if sig is None:
+                continue
+            meta = song_meta.get(path) or {}
+            length = song_lengths.get(path)
+            self._entries[path] = sig + [
+                meta.get("artist", "") or "", meta.get("album", "") or "", meta.get("year", "") or "",
+                float(length) if length is not None else None,
+            ]
+            self._checked.add(path)
+        if self._entries:
+            self._schedule_flush()
+
+    def _write_pending(self):
+        generation = self.generation + 1
+        mirrored = self.mirrored
+        if gud.hasIndexedQueries():
+            batch = self._unmirrored
+            if not batch or gud.addUserData({
+                "song_meta": {p: {"artist": e[2], "album": e[3], "year": e[4]} for p, e in batch.items()},
+                "song_lengths": {p: e[5] for p, e in batch.items() if e[5] is not None},
+            }):
+                self._unmirrored = {}
+                mirrored = generation
+        else:
+            self._unmirrored = {}   # copied over in full once an indexed backend is used
+
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "generation": generation, "mirrored": mirrored,
+                           "entries": self._entries}, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"[MetadataCache] Error saving {self.path}: {e}")
+            return False
+        self.generation = generation
+        self.mirrored = mirrored
+        self.index.save(generation)
+        return True
+
+    # ------------------ lookups ------------------
+
+    def get(self, path):
+        """Return {"artist", "album", "year", "length"} for `path`, or None if not cached/stale."""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and path not in self._checked:
+                self._checked.add(path)
+                if _signature(path) != entry[:2]:
+                    del self._entries[path]
+                    self.index.remove(path)
+                    self._schedule_flush()
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return {"artist": entry[2], "album": entry[3], "year": entry[4], "length": entry[5]}
+
+    def peek(self, path):
+        """
+        Like get(), but never touches the disk: an entry not yet validated this
+        session is returned as cached. For list builds on the Tk thread; the
+        background tag scan validates and re-reads stale entries.
+        """
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return None
+            return {"artist": entry[2], "album": entry[3], "year": entry[4], "length": entry[5]}
+
+    def __contains__(self, path):
+        return self.get(path) is not None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    # ------------------ writes ------------------
+
+    def put(self, path, meta, length=None):
+        """Cache tags (a dict or SongRecord) for one file."""
+        self.put_many([(path, meta, length)])
+
+    def put_many(self, items):
+        """Cache [(path, meta, length)] in one batch; meta may be a dict or a SongRecord."""
+        with self._lock:
+            for path, meta, length in items:
+                sig = _signature(path)
+                if sig is None:
+                    continue
+                if not isinstance(meta, dict):
+                    length = meta.duration if length is None else length
+                    meta = meta.meta()
+                entry = sig + [
+                    meta.get("artist", "") or "", meta.get("album", "") or "", meta.get("year", "") or "",
+                    float(length) if length is not None else None,
+                ]
+                self._entries[path] = entry
+                self.index.add(path, entry[2], entry[3], entry[5])
+                self._unmirrored[path] = entry
+                self._checked.add(path)
+            self._schedule_flush()
+
+    def invalidate(self, paths):
+        """Drop the entries for `paths` (files that changed or disappeared)."""
+        with self._lock:
+            dropped = 0
+            for path in paths:
+                if self._entries.pop(path, None) is not None:
+                    self.index.remove(path)
+                    dropped += 1
+                self._unmirrored.pop(path, None)
+                self._checked.discard(path)
+            if dropped:
+                self._schedule_flush()
+            return dropped
+
+    # ------------------ aggregation queries (see libraryIndex) ------------------
+
+    def artists(self):
+        with self._lock:
+            return self.index.artists()
+
+    def albums(self, artist=None):
+        with self._lock:
+            return self.index.albums(artist)
+
+    def tracks(self, artist, album=None):
+        with self._lock:
+            return self.index.tracks(artist, album)
+
+    def groups(self, by="artist"):
+        with self._lock:
+            return list(self.index.groups(by))
+
+    def total_duration(self):
+        with self._lock:
+            return self.index.total_duration
+
+    def duration_of(self, paths):
+        """Summed cached length of `paths` in seconds, without touching the disk (see peek())."""
+        with self._lock:
+            total = 0.0
+            for path in paths:
+                entry = self._entries.get(path)
+                if entry is not None and entry[5]:
+                    total += entry[5]
+            return total
+
+    def evict_missing(self, known=()):
+        """Drop entries whose file no longer exists; paths in `known` are taken as present."""
+        known = known if isinstance(known, (set, frozenset, dict)) else set(known)
+        with self._lock:
+            missing = [p for p in self._entries if p not in known and not os.path.exists(p)]
+        return self.invalidate(missing)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    The process-wide cache, loaded on first use. Only the parent process calls
+    this; tag-reading workers import the module without loading or writing it.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = MetadataCache()
+            atexit.register(_cache.flush)
+        return _cache
@@ -0,0 +1,288 @@
+"""
+Single-pass metadata extraction.
+
+Every consumer (playback labels, durations, library rows, album art, the tag
+pool) goes through here, so a file is parsed once and the result is shared as
+a compact SongRecord. Records are cached in memory per path and revalidated
+against the file's (size, mtime_ns). A record's art_hash names its cover:
+the hash of the embedded art bytes, or of the cover.jpg/folder.jpg beside it
+when nothing is embedded. Cover bytes are kept in a small LRU keyed by that
+hash, so an album's tracks share one entry.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+
+CACHE_SIZE = 4096       # records kept in memory
+ART_CACHE_SIZE = 32     # distinct covers kept in memory
+COVER_FILES = ("cover.jpg", "folder.jpg", "cover.png", "folder.png")
+
+# tag keys per container: ID3, MP4, Vorbis/FLAC, ASF
+_TAG_KEYS = {
+    "title": ("TIT2", "\xa9nam", "title", "Title"),
+    "artist": ("TPE1", "\xa9ART", "artist", "aART", "Author"),
+    "album": ("TALB", "\xa9alb", "album", "WM/AlbumTitle"),
+    "year": ("TDRC", "TYER", "\xa9day", "date", "WM/Year"),
+}
+
+
+class SongRecord:
+    """Everything the UI needs to know about one file."""
+
+    __slots__ = ("path", "title", "artist", "album", "year", "duration", "bitrate", "art_hash", "art_file")
+
+    def __init__(self, path, title="", artist="", album="", year="", duration=0.0, bitrate=0, art_hash="", art_file=""):
+        self.path = path
+        self.title = title
+        self.artist = artist
+        self.album = album
+        self.year = year
+        self.duration = duration    # seconds
+        self.bitrate = bitrate      # bits per second
+        self.art_hash = art_hash    # blake2b of the cover (embedded bytes or cover file), "" if none
+        self.art_file = art_file    # the cover.jpg/folder.jpg used when nothing is embedded
+
+    def meta(self):
+        """The fields persisted in the user data's song_meta section."""
+        return {"artist": self.artist, "album": self.album, "year": self.year}
+
+    def __repr__(self):
+        return (f"SongRecord({self.path!r}, title={self.title!r}, artist={self.artist!r}, "
+                f"album={self.album!r}, duration={self.duration:.1f})")
+
+
+def _text(value):
+    if hasattr(value, "text"):      # ID3 frames
+        value = value.text
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else ""
+    return str(value) if value is not None else ""
+
+
+def _lookup(tags, field):
+    for key in _TAG_KEYS[field]:
+        try:
+            if key in tags:
+                value = _text(tags[key])
+                if value:
+                    return value
+        except Exception:
+            continue
+    return ""
+
+
+def _embedded_art(audio):
+    """Return the raw bytes of the first embedded picture, or None."""
+    tags = getattr(audio, "tags", None)
+    try:
+        if tags is not None and hasattr(tags, "getall"):    # ID3 APIC
+            apics = tags.getall("APIC")
+            if apics:
+                return apics[0].data
+    except Exception:
+        pass
+    try:
+        covr = tags.get("covr") if tags else None          # MP4 covr
+        if covr:
+            art = covr[0]
+            return bytes(getattr(art, "data", art))
+    except Exception:
+        pass
+    try:
+        pics = getattr(audio, "pictures", None)            # FLAC
+        if pics:
+            return pics[0].data
+    except Exception:
+        pass
+    return None
+
+
+def _extract_mutagen(path):
+    from mutagen import File as MutagenFile  # type: ignore
+    audio = MutagenFile(path)
+    if audio is None:
+        return SongRecord(path), None
+    tags = getattr(audio, "tags", None) or {}
+    info = getattr(audio, "info", None)
+    record = SongRecord(
+        path,
+        title=_lookup(tags, "title"),
+        artist=_lookup(tags, "artist"),
+        album=_lookup(tags, "album"),
+        year=_lookup(tags, "year")[:4],
+        duration=float(getattr(info, "length", 0.0) or 0.0),
+        bitrate=int(getattr(info, "bitrate", 0) or 0),
+    )
+    return record, _embedded_art(audio)
+
+
+def _extract_tinytag(path):
+    from tinytag import TinyTag  # type: ignore
+    tag = TinyTag.get(path, image=True)
+    art = None
+    try:
+        images = getattr(tag, "images", None)
+        art = images.any.data if images is not None and images.any else tag.get_image()
+    except Exception:
+        art = None
+    record = SongRecord(
+        path,
+        title=tag.title or "",
+        artist=tag.artist or "",
+        album=tag.album or "",
+        year=str(tag.year or "")[:4],
+        duration=float(tag.duration or 0.0),
+        bitrate=int((tag.bitrate or 0) * 1000),
+    )
+    return record, art
+
+
+_folder_covers = {}     # directory -> (dir mtime_ns, cover path, art hash)
+
+
+def folder_cover(directory):
+    """
+    (cover path, art hash) for the first of COVER_FILES in `directory`, or ("", "").
+    Looked up once per directory (until its mtime changes), however many tracks it holds.
+    """
+    try:
+        dir_mtime = os.stat(directory).st_mtime_ns
+    except OSError:
+        return "", ""
+    cached = _folder_covers.get(directory)
+    if cached is not None and cached[0] == dir_mtime:
+        return cached[1], cached[2]
+    found = ("", "")
+    for name in COVER_FILES:
+        candidate = os.path.join(directory, name)
+        try:
+            mtime_ns = os.stat(candidate).st_mtime_ns
+        except OSError:
+            continue
+        key = f"{candidate}:{mtime_ns}".encode("utf-8", "surrogatepass")
+        found = (candidate, hashlib.blake2b(key, digest_size=16).hexdigest())
+        break
+    _folder_covers[directory] = (dir_mtime,) + found
+    return found
+
+
+def extract(path):
+    """
+    Parse `path` once and return (SongRecord, embedded art bytes or None).
+    Uncached and Tk-free, so it is safe to call from pool workers.
+    """
+    try:
+        record, art = _extract_mutagen(path)
+    except ImportError:
+        try:
+            record, art = _extract_tinytag(path)
+        except Exception:
+            record, art = SongRecord(path), None
+    except Exception:
+        record, art = SongRecord(path), None
+    if art:
+        record.art_hash = hashlib.blake2b(art, digest_size=16).hexdigest()
+    elif path:
+        record.art_file, record.art_hash = folder_cover(os.path.dirname(path) or ".")
+    return record, art
+
+
+class RecordCache:
+    """Thread-safe LRU of SongRecords keyed by path and validated by stat."""
+
+    def __init__(self, size=CACHE_SIZE, art_size=ART_CACHE_SIZE):
+        self.size = size
+        self.art_size = art_size
+        self._records = OrderedDict()   # path -> (sig, SongRecord)
+        self._art = OrderedDict()       # art_hash -> bytes
+        self._extracting = {}           # path -> Event, set when its in-flight extract() is done
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _signature(path):
+        try:
+            st = os.stat(path)
+            return (st.st_size, st.st_mtime_ns)
+        except OSError:
+            return None
+
+    def get(self, path, _need_art=False):
+        while True:
+            sig = self._signature(path)
+            with self._lock:
+                entry = self._records.get(path)
+                if entry is not None and entry[0] == sig and sig is not None:
+                    record = entry[1]
+                    if not _need_art or not record.art_hash or record.art_file or record.art_hash in self._art:
+                        self._records.move_to_end(path)
+                        return record
+                pending = self._extracting.get(path)
+                if pending is None:
+                    pending = self._extracting[path] = threading.Event()
+                    break
+            # another thread is parsing this file (e.g. the art worker): use its result
+            pending.wait()
+
+        try:
+            record, art = extract(path)
+            with self._lock:
+                self._records[path] = (sig, record)
+                self._records.move_to_end(path)
+                while len(self._records) > self.size:
+                    self._records.popitem(last=False)
+                if art:
+                    self._remember_art(record.art_hash, art)
+        finally:
+            with self._lock:
+                del self._extracting[path]
+            pending.set()
+        return record
+
+    def _remember_art(self, art_hash, art):
+        self._art[art_hash] = art
+        self._art.move_to_end(art_hash)
+        while len(self._art) > self.art_size:
+            self._art.popitem(last=False)
+
+    def get_art(self, path):
+        record = self.get(path, _need_art=True)
+        if not record.art_hash:
+            return None
+        with self._lock:
+            art = self._art.get(record.art_hash)
+            if art is not None or not record.art_file:
+                return art
+        try:
+            with open(record.art_file, "rb") as f:
+                art = f.read()
+        except OSError:
+            return None
+        with self._lock:
+            self._remember_art(record.art_hash, art)
+        return art
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self._art.clear()
+
+
+_cache = RecordCache()
+
+
+def get(path):
+    """Cached SongRecord for `path` (an empty record if it cannot be read)."""
+    return _cache.get(path)
+
+
+def get_art(path):
+    """Cover bytes for `path` (embedded or the folder cover), or None; shares the parse with get()."""
+    return _cache.get_art(path)
+
+
+def clear():
+    _cache.clear()
+    _folder_covers.clear()
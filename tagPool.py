@@ -0,0 +1,295 @@
+"""
+Parallel tag and duration extraction for library scans.
+
+Tag parsing is spread over a process (or thread) pool; results are streamed
+back in batches, written to metaCache and reported through a progress
+callback. Nothing in here touches Tk: callbacks run on the pool's feeder
+thread, so GUI callers must hop to the Tk thread themselves.
+
+Usable headless:
+    python tagPool.py [Music] [--workers N] [--threads]
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import getUserData as gud
+import metaCache
+import songRecord
+
+
+DEFAULT_WORKERS = int(os.getenv("PYTUNES_SCAN_WORKERS", "0")) or max(1, (os.cpu_count() or 2) - 1)
+BATCH_SIZE = 64
+PREFETCH_BATCH = 16     # small, so urgent requests jump the queue quickly
+
+
+def read_tags(path):
+    """
+    Return (path, {"artist", "album", "year", "length"}) for one file.
+    Runs inside pool workers, so it must stay importable and Tk-free.
+    """
+    record, _art = songRecord.extract(path)
+    meta = record.meta()
+    meta["length"] = record.duration
+    return path, meta
+
+
+def store_batch(results):
+    """Write one batch of read_tags() results into the metadata cache."""
+    metaCache.get_cache().put_many([(p, m, m["length"]) for p, m in results])
+
+
+class ScanJob:
+    """Handle for one background extraction run."""
+
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.elapsed = 0.0
+        self._cancel = threading.Event()
+        self.finished = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def wait(self, timeout=None):
+        return self.finished.wait(timeout)
+
+
+class TagExtractionPool:
+    """Reusable worker pool; start() may be called repeatedly (one job at a time)."""
+
+    def __init__(self, workers=DEFAULT_WORKERS, use_processes=True, batch_size=BATCH_SIZE):
+        self.workers = max(1, int(workers))
+        self.use_processes = use_processes
+        self.batch_size = batch_size
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.use_processes:
+                # spawn: never fork a process that may be running a Tk interpreter
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tagPool")
+        return self._executor
+
+    def run(self, paths, on_batch=store_batch, on_progress=None, job=None):
+        """Extract tags for `paths` in the calling thread's time; returns the ScanJob."""
+        paths = list(paths)
+        job = job or ScanJob(len(paths))
+        started = time.perf_counter()
+        batch = []
+        with self._lock:
+            executor = self._get_executor()
+            chunksize = max(1, min(32, len(paths) // (self.workers * 4) or 1))
+            try:
+                for result in executor.map(read_tags, paths, chunksize=chunksize):
+                    if job.cancelled:
+                        break
+                    batch.append(result)
+                    job.done += 1
+                    if len(batch) >= self.batch_size:
+                        on_batch(batch)
+                        batch = []
+                        if on_progress:
+                            on_progress(job.done, job.total)
+                if batch and not job.cancelled:
+                    on_batch(batch)
+            except Exception as e:
+                print(f"[TagExtractionPool] Extraction failed: {e}")
+        job.elapsed = time.perf_counter() - started
+        if on_progress:
+            on_progress(job.done, job.total)
+        job.finished.set()
+        return job
+
+    def start(self, paths, on_batch=store_batch, on_progress=None, on_done=None):
+        """Run extraction on a background thread; returns the ScanJob straight away."""
+        paths = list(paths)
+        job = ScanJob(len(paths))
+
+        def worker():
+            self.run(paths, on_batch, on_progress, job)
+            if on_done:
+                on_done(job)
+
+        threading.Thread(target=worker, name="tagPool-feeder", daemon=True).start()
+        return job
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class MetadataPrefetcher:
+    """
+    Feeds a TagExtractionPool from a two-level queue on one background thread.
+    request(paths, urgent=True) puts paths (e.g. the rows on screen) ahead of
+    everything already queued; they are picked up at the next batch boundary.
+
+    Callbacks run on the prefetch thread:
+      on_start()            the queue went from idle to busy
+      on_batch(paths)       tags for `paths` are now in metaCache
+      on_progress(done, total)
+      on_idle()             everything requested so far has been read
+    """
+
+    def __init__(self, pool, on_start=None, on_batch=None, on_progress=None, on_idle=None,
+                 batch_size=PREFETCH_BATCH):
+        self.pool = pool
+        self.on_start = on_start
+        self.on_batch = on_batch
+        self.on_progress = on_progress
+        self.on_idle = on_idle
+        self.batch_size = batch_size
+        self._urgent = deque()
+        self._normal = deque()
+        self._queued = set()    # requested and not yet read
+        self._cond = threading.Condition()
+        self._closed = False
+        self._busy = False
+        self.done = 0
+        self.total = 0
+        self._thread = threading.Thread(target=self._run, name="tagPool-prefetch", daemon=True)
+        self._thread.start()
+
+    @property
+    def busy(self):
+        return self._busy
+
+    def is_pending(self, path):
+        return path in self._queued
+
+    def request(self, paths, urgent=False):
+        """Queue `paths` for reading; already-queued paths are only re-prioritised."""
+        with self._cond:
+            added = 0
+            for path in paths:
+                if not path:
+                    continue
+                if path not in self._queued:
+                    self._queued.add(path)
+                    added += 1
+                    (self._urgent if urgent else self._normal).append(path)
+                elif urgent:
+                    self._urgent.append(path)   # the stale copy further back is skipped
+            if added or urgent:
+                self.total += added
+                self._cond.notify()
+            return added
+
+    def _take_batch(self):
+        batch = []
+        for queue in (self._urgent, self._normal):
+            while queue and len(batch) < self.batch_size:
+                path = queue.popleft()
+                if path in self._queued and path not in batch:
+                    batch.append(path)
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                batch = self._take_batch()
+                while not batch and not self._closed:
+                    if self._busy:
+                        self._busy = False
+                        self.done = self.total = 0
+                        if self.on_idle:
+                            self._cond.release()
+                            try:
+                                self._emit(self.on_idle)
+                            finally:
+                                self._cond.acquire()
+                    else:
+                        self._cond.wait()
+                    batch = self._take_batch()
+                if self._closed:
+                    return
+                started = not self._busy
+                self._busy = True
+
+            if started:
+                self._emit(self.on_start)
+            try:
+                self.pool.run(batch)
+            except Exception as e:
+                print(f"[MetadataPrefetcher] Batch failed: {e}")
+            with self._cond:
+                self._queued.difference_update(batch)
+                self.done += len(batch)
+                done, total = self.done, self.total
+            self._emit(self.on_batch, batch)
+            self._emit(self.on_progress, done, total)
+
+    def _emit(self, callback, *args):
+        """Call one of the on_* hooks; a failing hook must not end the prefetch thread."""
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception as e:
+            print(f"[MetadataPrefetcher] Error in callback: {e}")
+
+    def cancel(self):
+        """Forget everything that has not been read yet."""
+        with self._cond:
+            self._urgent.clear()
+            self._normal.clear()
+            self._queued.clear()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self.cancel()
+
+
+def paths_missing_metadata():
+    """Return the library paths with no valid cached tags (new, or changed since cached)."""
+    data = gud.getUserDataView()
+    if not data:
+        return []
+    cache = metaCache.get_cache()
+    missing = []
+    for meta in (data[0].get("songs", {}) or {}).values():
+        path = (meta or {}).get("loc", "")
+        if path and path not in cache:
+            missing.append(path)
+    return missing
+
+
+if __name__ == "__main__":
+    import argparse
+    import libraryScanner
+
+    parser = argparse.ArgumentParser(description="Scan the music folder and cache tags/lengths.")
+    parser.add_argument("root", nargs="?", default=libraryScanner.MUSIC_DIR)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--threads", action="store_true", help="use threads instead of processes")
+    args = parser.parse_args()
+
+    print(libraryScanner.sync_library(args.root))
+    pool = TagExtractionPool(args.workers, use_processes=not args.threads)
+    job = pool.run(
+        paths_missing_metadata(),
+        on_progress=lambda done, total: print(f"\r{done}/{total}", end="", flush=True)
+    )
+    pool.close()
+    metaCache.get_cache().flush()
+    gud.flush()
+    print(f"\nRead tags for {job.done} files in {job.elapsed:.1f}s")
+    print(metaCache.get_cache().stats())
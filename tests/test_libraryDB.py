@@ -0,0 +1,57 @@
+import libraryDB
+
+
+def _open(tmp_path):
+    return libraryDB.SQLiteUserDataStore(
+        path=str(tmp_path / "library.db"), json_dir=str(tmp_path / "userdata"), flush_interval=0
+    )
+
+
+def test_merge_with_unknown_length_keeps_the_rest(tmp_path):
+    song = str(tmp_path / "a.mp3")
+    store = _open(tmp_path)
+    assert store.merge({"song_lengths": {song: None}, "settings": {"darkMode": True}})
+    store.close()
+
+    data = _open(tmp_path).load()
+    assert data[0]["settings"] == {"darkMode": True}
+    assert song not in data[0].get("song_lengths", {})
+
+
+def test_merge_updates_a_known_length(tmp_path):
+    song = str(tmp_path / "a.mp3")
+    store = _open(tmp_path)
+    store.merge({"song_lengths": {song: None}})
+    store.merge({"song_lengths": {song: "201.5"}})
+    assert store.load()[0]["song_lengths"] == {song: 201.5}
+
+
+def test_mirrored_tags_keep_the_year(tmp_path):
+    song = str(tmp_path / "a.mp3")
+    store = _open(tmp_path)
+    store.merge({"song_meta": {song: {"artist": "A", "album": "B", "year": "2001"}}})
+    assert store.load()[0]["song_meta"] == {song: {"artist": "A", "album": "B", "year": "2001"}}
+
+
+def test_year_column_added_to_an_older_database(tmp_path):
+    conn = libraryDB.sqlite3.connect(str(tmp_path / "library.db"))
+    conn.execute("CREATE TABLE tracks (path TEXT PRIMARY KEY, artist TEXT, album TEXT, length REAL)")
+    conn.commit()
+    conn.close()
+
+    store = _open(tmp_path)
+    song = str(tmp_path / "a.mp3")
+    store.merge({"song_meta": {song: {"artist": "A", "year": "1999"}}})
+    assert store.load()[0]["song_meta"][song]["year"] == "1999"
+
+
+def test_search_matches_percent_and_underscore_literally(tmp_path):
+    store = _open(tmp_path)
+    store.merge({"songs": {
+        "song1": {"name": "100% Pure", "loc": "a.mp3"},
+        "song2": {"name": "1000 Pure", "loc": "b.mp3"},
+        "song3": {"name": "snake_case", "loc": "c.mp3"},
+        "song4": {"name": "snakeXcase", "loc": "d.mp3"},
+    }})
+    assert store.query_song_ids("0%") == ["song1"]
+    assert store.query_song_ids("e_c") == ["song3"]
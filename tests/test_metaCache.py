@@ -0,0 +1,52 @@
+import metaCache
+
+
+def _song(tmp_path, name):
+    path = tmp_path / name
+    path.write_bytes(b"\0" * 16)
+    return str(path)
+
+
+def test_playlist_duration_grows_as_tags_arrive(tmp_path):
+    cache = metaCache.MetadataCache(path=str(tmp_path / "metadata.json"), flush_interval=60)
+    first, second = _song(tmp_path, "a.mp3"), _song(tmp_path, "b.mp3")
+    meta = {"artist": "A", "album": "B", "year": "2001"}
+
+    # nothing read yet: the playlist shows 0 rather than blocking on the files
+    assert cache.duration_of([first, second]) == 0
+
+    cache.put_many([(first, meta, 185.0)])
+    assert cache.duration_of([first, second]) == 185.0
+
+    cache.put_many([(second, meta, 3600.0)])
+    assert cache.duration_of([first, second]) == 3785.0
+
+
+def test_duration_skips_songs_without_a_length(tmp_path):
+    cache = metaCache.MetadataCache(path=str(tmp_path / "metadata.json"), flush_interval=60)
+    song = _song(tmp_path, "a.mp3")
+    cache.put_many([(song, {"artist": "A"}, None)])
+    assert cache.duration_of([song, str(tmp_path / "missing.mp3")]) == 0
+
+
+def test_entries_cached_under_json_reach_an_indexed_backend(tmp_path, monkeypatch):
+    song = _song(tmp_path, "a.mp3")
+    path = str(tmp_path / "metadata.json")
+    monkeypatch.setattr(metaCache.gud, "hasIndexedQueries", lambda: False)
+    cache = metaCache.MetadataCache(path=path, flush_interval=60)
+    cache.put_many([(song, {"artist": "A", "album": "B", "year": "2001"}, 185.0)])
+    assert cache.flush()
+
+    mirrored = []
+    monkeypatch.setattr(metaCache.gud, "hasIndexedQueries", lambda: True)
+    monkeypatch.setattr(metaCache.gud, "addUserData", lambda data: mirrored.append(data) or True)
+    cache = metaCache.MetadataCache(path=path, flush_interval=60)
+    assert cache.flush()
+    assert mirrored == [{
+        "song_meta": {song: {"artist": "A", "album": "B", "year": "2001"}},
+        "song_lengths": {song: 185.0},
+    }]
+
+    # in sync now: the next start has nothing to copy
+    cache = metaCache.MetadataCache(path=path, flush_interval=60)
+    assert cache.flush() and len(mirrored) == 1
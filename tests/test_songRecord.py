@@ -0,0 +1,27 @@
+import threading
+import time
+
+import songRecord
+
+
+def test_concurrent_gets_share_one_parse(tmp_path, monkeypatch):
+    path = tmp_path / "a.mp3"
+    path.write_bytes(b"\0" * 16)
+    calls = []
+
+    def slow_extract(p):
+        calls.append(p)
+        time.sleep(0.05)
+        return songRecord.SongRecord(p, title="A", duration=12.0), None
+
+    monkeypatch.setattr(songRecord, "extract", slow_extract)
+    cache = songRecord.RecordCache()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(str(path)))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert calls == [str(path)]
+    assert len(results) == 4 and all(r is results[0] for r in results)
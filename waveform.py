@@ -0,0 +1,165 @@
+"""
+Waveform peaks for the seek bar.
+
+Each track is decoded once in a low-priority worker process (the same decoder
+the loudness analysis uses) and reduced with NumPy to PEAK_BINS min/max pairs.
+The pairs are stored as signed bytes in a small binary file per track under
+cache/waveforms/, headed by the file's size and mtime, so a cache hit is one
+~2 KB read and a changed file is simply regenerated. Nothing here decodes on
+the calling thread.
+"""
+
+import hashlib
+import os
+import struct
+import threading
+from array import array
+from concurrent.futures.process import BrokenProcessPool
+
+import getUserData as gud
+import loudness
+
+
+WAVEFORM_DIR = "waveforms"
+PEAK_BINS = 1000
+HEADER = struct.Struct("<4sHIqq")   # magic, version, bins, size, mtime_ns
+MAGIC = b"PTWF"
+VERSION = 1
+
+
+def compute_peaks(path, bins=PEAK_BINS):
+    """Return (size, mtime_ns, int8 bytes of interleaved min/max) for `path`. Worker entry point."""
+    import numpy as np
+    st = os.stat(path)
+    samples, _rate = loudness.decode(path)
+    mono = samples.mean(axis=1) if samples.ndim == 2 else samples
+    if not mono.size:
+        return st.st_size, st.st_mtime_ns, b""
+    bins = min(bins, mono.size)
+    per_bin = -(-mono.size // bins)
+    padded = np.zeros(per_bin * bins, dtype=np.float32)
+    padded[:mono.size] = mono
+    blocks = padded.reshape(bins, per_bin)
+    peaks = np.empty(bins * 2, dtype=np.int8)
+    peaks[0::2] = np.clip(np.round(blocks.min(axis=1) * 127), -127, 127)
+    peaks[1::2] = np.clip(np.round(blocks.max(axis=1) * 127), -127, 127)
+    return st.st_size, st.st_mtime_ns, peaks.tobytes()
+
+
+class WaveformCache:
+
+    def __init__(self, directory=None):
+        self.directory = directory or os.path.join(gud.getCacheDir(), WAVEFORM_DIR)
+        os.makedirs(self.directory, exist_ok=True)
+        self._executor = None
+        self._inflight = {}     # path -> [callbacks]
+        self._lock = threading.Lock()
+
+    def _file_for(self, path):
+        name = hashlib.blake2b(path.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+        return os.path.join(self.directory, f"{name}.peaks")
+
+    def load(self, path):
+        """Cached peaks for `path` as array('b') of min/max pairs, or None if missing/stale."""
+        try:
+            st = os.stat(path)
+            with open(self._file_for(path), "rb") as f:
+                magic, version, bins, size, mtime_ns = HEADER.unpack(f.read(HEADER.size))
+                if magic != MAGIC or version != VERSION or (size, mtime_ns) != (st.st_size, st.st_mtime_ns):
+                    return None
+                peaks = array("b")
+                peaks.frombytes(f.read(bins * 2))
+                return peaks if len(peaks) == bins * 2 else None
+        except (OSError, struct.error):
+            return None
+
+    def _store(self, path, size, mtime_ns, data):
+        target = self._file_for(path)
+        tmp_path = f"{target}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, VERSION, len(data) // 2, size, mtime_ns))
+                f.write(data)
+            os.replace(tmp_path, target)
+        except OSError as e:
+            print(f"[WaveformCache] Error saving peaks for {path}: {e}")
+
+    def request(self, path, on_ready):
+        """
+        Call on_ready(path, peaks) once peaks exist; straight away on a cache hit,
+        otherwise from a worker thread after a background decode.
+        """
+        peaks = self.load(path)
+        if peaks is not None:
+            on_ready(path, peaks)
+            return
+        if not loudness.LoudnessAnalyser.available():
+            return
+        with self._lock:
+            if path in self._inflight:
+                self._inflight[path].append(on_ready)
+                return
+            self._inflight[path] = [on_ready]
+            future = self._get_executor().submit(compute_peaks, path)
+        future.add_done_callback(lambda f: self._finished(path, f))
+
+    def _finished(self, path, future):
+        with self._lock:
+            callbacks = self._inflight.pop(path, [])
+        try:
+            size, mtime_ns, data = future.result()
+        except BrokenProcessPool as e:
+            print(f"[WaveformCache] Worker died while decoding {path}: {e}")
+            self.close()    # the next request starts a fresh worker
+            return
+        except Exception as e:
+            print(f"[WaveformCache] Could not compute peaks for {path}: {e}")
+            return
+        self._store(path, size, mtime_ns, data)
+        peaks = array("b")
+        peaks.frombytes(data)
+        for callback in callbacks:
+            try:
+                callback(path, peaks)
+            except Exception as e:
+                print(f"[WaveformCache] on_ready failed: {e}")
+
+    def _get_executor(self):
+        if self._executor is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            self._executor = ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn"), initializer=loudness.worker_init
+            )
+        return self._executor
+
+    def close(self):
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def columns(peaks, width):
+    """Reduce min/max pairs to `width` columns of (low, high) in -1..1, for drawing."""
+    bins = len(peaks) // 2
+    if not bins or width <= 0:
+        return []
+    out = []
+    for x in range(width):
+        start = x * bins // width
+        stop = max(start + 1, (x + 1) * bins // width)
+        out.append((min(peaks[2 * start:2 * stop:2]) / 127.0, max(peaks[2 * start + 1:2 * stop:2]) / 127.0))
+    return out
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """The process-wide cache, created (with its directory) on first use in the parent process."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = WaveformCache()
+        return _cache